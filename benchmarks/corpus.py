@@ -0,0 +1,63 @@
+import random
+
+EN_WORDS = (
+    "the train is late again and rain falls on the platform while I fill "
+    "another form for the office that wants one more proof of who I am "
+    "sunday market bread warm light my manager calls at nine we buried "
+    "the cat under the lemon tree nobody spoke for an hour"
+).split()
+
+FR_WORDS = (
+    "le train est encore en retard et la pluie tombe sur le quai pendant "
+    "que je remplis un autre formulaire pour la préfecture qui veut une "
+    "preuve de plus marché du dimanche pain chaud lumière douce mon chef "
+    "appelle à neuf heures nous avons enterré le chat sous le citronnier"
+).split()
+
+
+def generate_corpus(n: int, fr_ratio: float = 0.4, seed: int = 0) -> list[dict]:
+    """
+    Deterministic synthetic poems in mixed English/French, shaped like the
+    parsed Google Doc sections: {"title", "date", "lines", "language"}.
+    """
+    rng = random.Random(seed)
+    poems = []
+    for i in range(n):
+        language = "fr" if rng.random() < fr_ratio else "en"
+        words = FR_WORDS if language == "fr" else EN_WORDS
+        lines = [
+            " ".join(rng.choices(words, k=rng.randint(4, 10)))
+            for _ in range(rng.randint(3, 12))
+        ]
+        title = f"{' '.join(rng.choices(words, k=2)).capitalize()} n° {i}"
+        date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+        poems.append(
+            {"title": title, "date": date, "lines": lines, "language": language}
+        )
+    return poems
+
+
+def _paragraph(text: str, style: str) -> dict:
+    return {
+        "paragraph": {
+            "paragraphStyle": {"namedStyleType": style},
+            "elements": [{"textRun": {"content": text + "\n"}}],
+        }
+    }
+
+
+def build_documents(poems: list[dict], n_docs: int = 1, revision: str = "r1"):
+    """Spreads the poems over `n_docs` Docs API documents, keyed by doc id."""
+    documents = {}
+    for d in range(n_docs):
+        content = []
+        for poem in poems[d::n_docs]:
+            content.append(_paragraph(poem["title"], "HEADING_4"))
+            first, *rest = poem["lines"]
+            content.append(_paragraph(f"{poem['date']} {first}", "NORMAL_TEXT"))
+            content.extend(_paragraph(line, "NORMAL_TEXT") for line in rest)
+        documents[f"doc-{d}"] = {
+            "revisionId": f"{revision}-{d}",
+            "body": {"content": content},
+        }
+    return documents
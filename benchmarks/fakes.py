@@ -0,0 +1,424 @@
+import time
+import types
+import asyncio
+import datetime
+import hashlib
+import itertools
+import threading
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import firestore
+
+
+class Latency:
+    """
+    Injected service latency: a fixed cost per call plus a transfer cost per
+    KiB, e.g. Latency(0.02, 0.0001) ~ 20ms round trip at ~10 MB/s.
+    """
+
+    def __init__(self, per_call: float = 0.0, per_kib: float = 0.0):
+        self.per_call = per_call
+        self.per_kib = per_kib
+        self.calls = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def wait(self, nbytes: int = 0):
+        with self._lock:
+            self.calls += 1
+            self.bytes += nbytes
+        delay = self.per_call + self.per_kib * nbytes / 1024
+        if delay:
+            time.sleep(delay)
+
+
+# === GCS ===
+class FakeBlob:
+    def __init__(self, bucket, name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+        self.content_encoding = None
+        self.generation = None
+        self.etag = None
+        self.updated = None
+        self.size = None
+        self.md5_hash = None
+
+    def _load_metadata(self, entry: dict):
+        for key in (
+            "content_type",
+            "content_encoding",
+            "generation",
+            "etag",
+            "updated",
+            "size",
+            "md5_hash",
+        ):
+            setattr(self, key, entry[key])
+
+    def _entry(self) -> dict:
+        entry = self.bucket.objects.get(self.name)
+        if entry is None:
+            raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+        return entry
+
+    def reload(self, **kwargs):
+        self.bucket.latency.wait()
+        self._load_metadata(self._entry())
+
+    def exists(self, **kwargs) -> bool:
+        self.bucket.latency.wait()
+        return self.name in self.bucket.objects
+
+    def upload_from_string(
+        self, data, content_type=None, if_generation_match=None, **kwargs
+    ):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.bucket.latency.wait(len(data))
+        with self.bucket.lock:
+            current = self.bucket.objects.get(self.name)
+            if if_generation_match is not None:
+                generation = current["generation"] if current else 0
+                if generation != if_generation_match:
+                    raise PreconditionFailed(f"Generation mismatch on {self.name}")
+            generation = next(self.bucket.generations)
+            entry = {
+                "data": data,
+                "content_type": content_type,
+                "content_encoding": self.content_encoding,
+                "generation": generation,
+                "etag": str(generation),
+                "updated": datetime.datetime.now(datetime.timezone.utc),
+                "size": len(data),
+                "md5_hash": hashlib.md5(data).hexdigest(),
+            }
+            self.bucket.objects[self.name] = entry
+        self._load_metadata(entry)
+
+    def download_as_bytes(self, start=None, end=None, raw_download=False, **kwargs):
+        entry = self._entry()
+        data = entry["data"]
+        # like the real client: gzip travels compressed and is inflated locally
+        wire_size = len(data)
+        if entry["content_encoding"] == "gzip" and not raw_download:
+            import gzip
+
+            data = gzip.decompress(data)
+        if start is not None or end is not None:
+            data = data[start or 0 : None if end is None else end + 1]
+            wire_size = len(data)
+        self.bucket.latency.wait(wire_size)
+        self._load_metadata(entry)
+        return data
+
+    def download_as_text(self, **kwargs) -> str:
+        return self.download_as_bytes(**kwargs).decode("utf-8")
+
+    def delete(self, **kwargs):
+        self.bucket.latency.wait()
+        with self.bucket.lock:
+            if self.bucket.objects.pop(self.name, None) is None:
+                raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+
+
+class FakeBucket:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.latency = client.latency
+        store = client.store.setdefault(name, {"objects": {}})
+        self.objects = store["objects"]
+        self.lock = client.lock
+        self.generations = client.generations
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str, **kwargs) -> FakeBlob | None:
+        self.latency.wait()
+        entry = self.objects.get(name)
+        if entry is None:
+            return None
+        blob = FakeBlob(self, name)
+        blob._load_metadata(entry)
+        return blob
+
+    def list_blobs(self, prefix: str = "", **kwargs):
+        self.latency.wait()
+        blobs = []
+        for name in sorted(self.objects):
+            if name.startswith(prefix):
+                blob = FakeBlob(self, name)
+                blob._load_metadata(self.objects[name])
+                blobs.append(blob)
+        return iter(blobs)
+
+
+class FakeStorageClient:
+    """In-process stand-in for google.cloud.storage.Client."""
+
+    def __init__(self, latency: Latency | None = None):
+        self.latency = latency or Latency()
+        self.store = {}
+        self.lock = threading.Lock()
+        self.generations = itertools.count(1)
+        # gcs_client mounts a bigger connection pool on the HTTP session
+        self._http = types.SimpleNamespace(mount=lambda prefix, adapter: None)
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(self, name)
+
+
+# === Firestore ===
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str):
+        return FakeCollectionReference(self.client, f"{self.path}/{name}")
+
+    def get(self, **kwargs) -> FakeDocumentSnapshot:
+        self.client.latency.wait()
+        return FakeDocumentSnapshot(self, self.client.documents.get(self.path))
+
+    def set(self, data: dict, merge: bool = False):
+        self.client.latency.wait()
+        self.client._apply(self.path, data, merge)
+
+
+class FakeCollectionReference:
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+
+    def document(self, document_id: str | None = None):
+        document_id = document_id or f"auto{next(self.client.ids)}"
+        return FakeDocumentReference(self.client, f"{self.path}/{document_id}")
+
+    def add(self, data: dict):
+        reference = self.document()
+        reference.set(data)
+        return datetime.datetime.now(datetime.timezone.utc), reference
+
+    def stream(self, **kwargs):
+        self.client.latency.wait()
+        for path in sorted(self.client.documents):
+            if path.rsplit("/", 1)[0] == self.path:
+                reference = FakeDocumentReference(self.client, path)
+                yield FakeDocumentSnapshot(reference, self.client.documents[path])
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self.client = client
+        self._writes = []
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._writes.append((reference.path, data, merge))
+
+    def commit(self):
+        self.client.latency.wait()
+        for path, data, merge in self._writes:
+            self.client._apply(path, data, merge)
+        self._writes = []
+
+
+class FakeFirestoreClient:
+    """In-process stand-in for google.cloud.firestore.Client."""
+
+    def __init__(self, latency: Latency | None = None):
+        self.latency = latency or Latency()
+        self.documents = {}
+        self.ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def get_all(self, references, **kwargs):
+        self.latency.wait()
+        for reference in references:
+            yield FakeDocumentSnapshot(reference, self.documents.get(reference.path))
+
+    def _apply(self, path: str, data: dict, merge: bool):
+        with self._lock:
+            current = self.documents.get(path, {}) if merge else {}
+            self.documents[path] = _merge(dict(current), data)
+
+
+def _merge(current: dict, update: dict) -> dict:
+    for key, value in update.items():
+        if isinstance(value, firestore.Increment):
+            current[key] = current.get(key, 0) + value.value
+        elif isinstance(value, dict):
+            current[key] = _merge(dict(current.get(key) or {}), value)
+        else:
+            current[key] = value
+    return current
+
+
+# === Google Docs ===
+class _FakeDocsRequest:
+    def __init__(self, service, document_id: str, fields: str | None):
+        self.service = service
+        self.document_id = document_id
+        self.fields = fields
+
+    def execute(self, **kwargs) -> dict:
+        document = self.service.documents_by_id[self.document_id]
+        if self.fields == "revisionId":
+            self.service.latency.wait()
+            return {"revisionId": document["revisionId"]}
+        self.service.latency.wait(len(str(document)))
+        return document
+
+
+class FakeDocsService:
+    """In-process stand-in for the Docs API `service` built by GDocsImporter."""
+
+    def __init__(self, documents_by_id: dict, latency: Latency | None = None):
+        self.documents_by_id = documents_by_id
+        self.latency = latency or Latency()
+
+    def documents(self):
+        return types.SimpleNamespace(
+            get=lambda documentId, fields=None: _FakeDocsRequest(
+                self, documentId, fields
+            )
+        )
+
+
+class FakeInstalledAppFlow:
+    @classmethod
+    def from_client_secrets_file(cls, path, scopes):
+        return cls()
+
+    def run_local_server(self, port=0):
+        return object()
+
+
+# === OpenAI ===
+def _fake_completion(messages: list[dict]) -> types.SimpleNamespace:
+    prompt = messages[-1]["content"]
+    if "Name: <" in prompt:
+        content = (
+            f"Name: Theme {len(prompt) % 97}\nEmoji: 🌧️\n"
+            "Description: Poems about waiting."
+        )
+    elif "thematic categories" in prompt:
+        content = (
+            "**Category 1: Existential Conundrums**\nPoems about meaning.\n"
+            "**Category 2: Coping with Reality**\nPoems about getting by."
+        )
+    elif "top 3" in prompt.lower():
+        content = "1. First: vivid.\n2. Second: honest.\n3. Third: wry."
+    else:
+        content = "A sentence for each poem."
+    prompt_tokens = len(prompt) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+        usage=types.SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+class FakeChatCompletions:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def create(self, messages, **kwargs):
+        self.latency.wait(sum(len(m["content"]) for m in messages))
+        return _fake_completion(messages)
+
+
+class FakeAsyncChatCompletions:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    async def create(self, messages, **kwargs):
+        size = sum(len(m["content"]) for m in messages)
+        await asyncio.to_thread(self.latency.wait, size)
+        return _fake_completion(messages)
+
+
+def fake_openai_clients(latency: Latency | None = None):
+    """Returns (`openai.OpenAI`, `openai.AsyncOpenAI`) stand-in classes."""
+    latency = latency or Latency()
+
+    class FakeOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(completions=FakeChatCompletions(latency))
+
+    class FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(
+                completions=FakeAsyncChatCompletions(latency)
+            )
+
+    return FakeOpenAI, FakeAsyncOpenAI
+
+
+# === Emotion model ===
+class FakeEmotionPipeline:
+    """Scores like the go-emotions pipeline, for runs without torch weights."""
+
+    LABELS = ["remorse", "grief", "love", "confusion", "caring", "annoyance"]
+
+    def __init__(self, per_poem: float = 0.0):
+        self.per_poem = per_poem
+        self.tokenizer = lambda texts, truncation=True: {
+            "input_ids": [text.split()[:512] for text in texts]
+        }
+
+    def __call__(self, inputs, batch_size=1, truncation=True):
+        texts = [inputs] if isinstance(inputs, str) else inputs
+        time.sleep(self.per_poem * len(texts))
+        outputs = [
+            [
+                {"label": label, "score": (len(text) * (i + 1)) % 97 / 97}
+                for i, label in enumerate(self.LABELS)
+            ]
+            for text in texts
+        ]
+        return [outputs[0]] if isinstance(inputs, str) else outputs
+
+
+class FakeSentenceTransformer:
+    """Hashed bag-of-words unit vectors: similar bodies get similar vectors."""
+
+    def __init__(self, per_poem: float = 0.0, dim: int = 384):
+        self.per_poem = per_poem
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        import numpy as np
+
+        time.sleep(self.per_poem * len(texts))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                vectors[row, int.from_bytes(digest[:4], "little") % self.dim] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
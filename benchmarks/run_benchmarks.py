@@ -0,0 +1,309 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import contextlib
+
+from .corpus import generate_corpus, build_documents
+from .fakes import (
+    Latency,
+    FakeStorageClient,
+    FakeFirestoreClient,
+    FakeDocsService,
+    FakeInstalledAppFlow,
+    FakeEmotionPipeline,
+    FakeSentenceTransformer,
+    fake_openai_clients,
+)
+
+BUCKET_NAME = "bench-bucket"
+APP_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "streamlit_app.py"
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the pipeline and app data loading against local fakes."
+    )
+    parser.add_argument("--poems", type=int, default=1000)
+    parser.add_argument(
+        "--docs", type=int, default=2, help="Google Docs to spread over"
+    )
+    parser.add_argument("--fr-ratio", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--layout", choices=["snapshot", "per_poem"], default="snapshot"
+    )
+    parser.add_argument(
+        "--codec", default="json+gzip", help="GCS_CODEC for the written artifacts"
+    )
+    parser.add_argument("--gcs-ms", type=float, default=20, help="GCS latency per call")
+    parser.add_argument("--gcs-ms-per-kib", type=float, default=0.1)
+    parser.add_argument("--docs-ms", type=float, default=150)
+    parser.add_argument("--firestore-ms", type=float, default=15)
+    parser.add_argument("--openai-ms", type=float, default=2000)
+    parser.add_argument(
+        "--llm-rpm", type=int, default=60, help="LLM_REQUESTS_PER_MINUTE"
+    )
+    parser.add_argument(
+        "--llm-tpm", type=int, default=40000, help="LLM_TOKENS_PER_MINUTE"
+    )
+    parser.add_argument("--theme-mode", choices=["prompt", "cluster"], default="prompt")
+    parser.add_argument("--model-ms-per-poem", type=float, default=5)
+    parser.add_argument(
+        "--real-models",
+        action="store_true",
+        help="Score with the real go-emotions model instead of a fake pipeline",
+    )
+    parser.add_argument(
+        "--dag",
+        action="store_true",
+        help="Make the first run through the stage DAG (scripts/run.py main)",
+    )
+    parser.add_argument("--votes", type=int, default=200)
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+class Recorder:
+    def __init__(self, latencies: dict[str, Latency]):
+        self.latencies = latencies
+        self.results = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        before = {k: (v.calls, v.bytes) for k, v in self.latencies.items()}
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        result = {"stage": name, "seconds": round(elapsed, 4)}
+        for key, latency in self.latencies.items():
+            calls, nbytes = before[key]
+            result[f"{key}_calls"] = latency.calls - calls
+            result[f"{key}_bytes"] = latency.bytes - nbytes
+        self.results.append(result)
+
+    def report(self) -> str:
+        keys = ["seconds"] + [f"{key}_calls" for key in self.latencies]
+        header = f"{'stage':<24}" + "".join(f"{key:>16}" for key in keys)
+        rows = [
+            f"{r['stage']:<24}" + "".join(f"{r[key]:>16}" for key in keys)
+            for r in self.results
+        ]
+        return "\n".join([header, "-" * len(header), *rows])
+
+
+def configure_environment(workdir: str, args):
+    """Env the pipeline modules read at import: caches go to a scratch dir."""
+    os.environ.update(
+        {
+            "GCS_BUCKET": BUCKET_NAME,
+            "GCS_LAYOUT": args.layout,
+            "GCS_CODEC": args.codec,
+            "GOOGLE_DOC_IDS": ",".join(f"doc-{d}" for d in range(args.docs)),
+            "GCS_CACHE_DIR": os.path.join(workdir, "gcs_cache"),
+            "ENRICH_CACHE_PATH": os.path.join(workdir, "enrich_cache.json"),
+            "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+            "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite"),
+            "LLM_CACHE_BYPASS": "1",
+            "LLM_REQUESTS_PER_MINUTE": str(args.llm_rpm),
+            "LLM_TOKENS_PER_MINUTE": str(args.llm_tpm),
+            "LLM_THEME_MODE": args.theme_mode,
+            "VOTE_FLUSH_INTERVAL": "0.05",
+            "APP_SNAPSHOT_PATH": os.path.join(workdir, "app_snapshot.json"),
+            "CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+            # score in-process, never on a warm worker running on this machine
+            "EMOJI_WORKER_SOCKET": "",
+        }
+    )
+
+
+def install_fakes(args, documents: dict) -> dict[str, Latency]:
+    """Points every external client the pipeline builds at an in-process fake."""
+    from google.cloud import storage, firestore
+    import openai
+    from scripts.text_process import gcs_client, gdocs_import
+    from scripts.db import firestore_client
+    from scripts.transformers import emoji_classifier_en, embeddings
+
+    latencies = {
+        "gcs": Latency(args.gcs_ms / 1000, args.gcs_ms_per_kib / 1000),
+        "docs": Latency(args.docs_ms / 1000),
+        "firestore": Latency(args.firestore_ms / 1000),
+        "openai": Latency(args.openai_ms / 1000),
+    }
+
+    gcs = FakeStorageClient(latencies["gcs"])
+    storage.Client = lambda *a, **k: gcs
+    gcs_client.get_storage_client.cache_clear()
+
+    db = FakeFirestoreClient(latencies["firestore"])
+    firestore.Client = lambda *a, **k: db
+    firestore_client.get_firestore_client.cache_clear()
+
+    docs = FakeDocsService(documents, latencies["docs"])
+    gdocs_import.build = lambda *a, **k: docs
+    gdocs_import.InstalledAppFlow = FakeInstalledAppFlow
+
+    openai.OpenAI, openai.AsyncOpenAI = fake_openai_clients(latencies["openai"])
+
+    if not args.real_models:
+        model = FakeEmotionPipeline(args.model_ms_per_poem / 1000)
+        emoji_classifier_en.get_emotion_classifier = lambda *a, **k: model
+        encoder = FakeSentenceTransformer(args.model_ms_per_poem / 1000)
+        embeddings.get_embedding_model = lambda *a, **k: encoder
+
+    return latencies
+
+
+def run_pipeline(recorder: Recorder, importer, prefix: str = ""):
+    """The stages of scripts/run.py, in order, each timed on its own."""
+    from scripts import run
+
+    with recorder.stage(f"{prefix}load_manifest"):
+        run_manifest = run.load_run_manifest(BUCKET_NAME)
+    with recorder.stage(f"{prefix}gdocs_import"):
+        poems, gdocs_state = run.import_stage(importer, run_manifest)
+    with recorder.stage(f"{prefix}gcs_export"):
+        failed = run.export_stage(
+            poems,
+            run.fingerprint_collection(poems, run.export_fingerprint),
+            run_manifest,
+        )
+        run_manifest["gdocs"] = run.exported_gdocs_state(gdocs_state, failed)
+        run.save_run_manifest(run_manifest, BUCKET_NAME)
+    with recorder.stage(f"{prefix}gcs_download"):
+        collection = run.download_stage()
+    fingerprints = run.fingerprint_collection(collection)
+    with recorder.stage(f"{prefix}emoji"):
+        emoji_output = run.emoji_stage(collection, fingerprints, run_manifest)
+    with recorder.stage(f"{prefix}llm"):
+        llm_output = run.llm_stage(collection, fingerprints, run_manifest)
+    with recorder.stage(f"{prefix}related"):
+        related_output = run.related_stage(collection, fingerprints, run_manifest)
+    with recorder.stage(f"{prefix}view_model"):
+        run.view_stage(collection, emoji_output, llm_output, related_output)
+        run.save_run_manifest(run_manifest, BUCKET_NAME)
+
+
+def run_pipeline_dag(recorder: Recorder):
+    """The whole run through the scheduler, analysis branches side by side."""
+    from scripts import run
+
+    with recorder.stage("dag_pipeline"):
+        run.main([])
+
+
+def run_app_loading(recorder: Recorder, cache_dir: str):
+    """What a Streamlit cold start and a background refresh check cost."""
+    from scripts.text_process.app_data import (
+        load_app_data,
+        app_data_version,
+        load_latest_outputs,
+        get_poems,
+    )
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    with recorder.stage("app_load_view_model"):
+        load_app_data(BUCKET_NAME)
+    with recorder.stage("app_load_raw_cold"):
+        load_latest_outputs(BUCKET_NAME)
+        get_poems(BUCKET_NAME)
+    with recorder.stage("app_load_raw_warm"):
+        load_latest_outputs(BUCKET_NAME)
+        get_poems(BUCKET_NAME)
+    with recorder.stage("app_version_check"):
+        app_data_version(BUCKET_NAME)
+
+
+def run_app_startup(recorder: Recorder):
+    """The app's first render: loading from GCS, then from a baked snapshot."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    from scripts.text_process.app_data import bake_app_snapshot
+
+    for name, bake in (
+        ("app_first_render_gcs", False),
+        ("app_first_render_snapshot", True),
+    ):
+        if bake:
+            bake_app_snapshot(BUCKET_NAME, os.environ["APP_SNAPSHOT_PATH"])
+        st.cache_resource.clear()  # a fresh process: no cache, no refresh thread
+        app = AppTest.from_file(APP_SCRIPT, default_timeout=60)
+        with recorder.stage(name):
+            app.run()
+        if app.exception:
+            raise RuntimeError(f"{name}: {app.exception[0].message}")
+
+
+def run_votes(recorder: Recorder, n_votes: int, titles: list[str]):
+    from scripts.db.vote_storage import store_vote, get_vote_buffer
+    from scripts.db.vote_tally import get_vote_counts, get_leaderboard
+
+    with recorder.stage("votes_enqueue"):
+        for i in range(n_votes):
+            store_vote(titles[i % len(titles) : i % len(titles) + 3])
+    with recorder.stage("votes_drain"):
+        get_vote_buffer().close()
+    with recorder.stage("leaderboard_cold"):
+        get_vote_counts(use_cache=False)
+    with recorder.stage("leaderboard_cached"):
+        get_leaderboard()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.disable(logging.INFO)
+    workdir = tempfile.mkdtemp(prefix="poems-bench-")
+    configure_environment(workdir, args)
+
+    corpus = generate_corpus(args.poems, args.fr_ratio, args.seed)
+    documents = build_documents(corpus, args.docs)
+    recorder = Recorder(install_fakes(args, documents))
+
+    from scripts.text_process.gdocs_import import GDocsImporter
+    from scripts.metrics import get_metrics
+
+    importer = GDocsImporter("fake-creds.json", [], None)
+    try:
+        if args.dag:
+            run_pipeline_dag(recorder)
+        else:
+            run_pipeline(recorder, importer)
+        # same docs again: the incremental path should make this nearly free
+        run_pipeline(recorder, importer, prefix="rerun_")
+        run_app_loading(recorder, os.environ["GCS_CACHE_DIR"])
+        run_app_startup(recorder)
+        run_votes(recorder, args.votes, [poem["title"] for poem in corpus])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(
+        f"{args.poems} poems, {args.docs} doc(s), layout={args.layout}, "
+        f"codec={args.codec}, "
+        f"gcs={args.gcs_ms}ms, openai={args.openai_ms}ms"
+    )
+    print(recorder.report())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "args": vars(args),
+                    "results": recorder.results,
+                    "metrics": get_metrics().to_dict(),
+                },
+                f,
+                indent=2,
+            )
+    return recorder.results
+
+
+# python -m benchmarks.run_benchmarks --poems 10000
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
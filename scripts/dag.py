@@ -0,0 +1,129 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .metrics import span, incr
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# stages running at once; the pipeline has at most three independent branches
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "3"))
+
+
+class Stage:
+    """
+    A named step of a pipeline: `fn` is called with the outputs of `deps`, in
+    that order, and returns this stage's output (JSON-serializable, so it can
+    be checkpointed).
+    """
+
+    def __init__(self, name: str, fn, deps: tuple[str, ...] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, deps={self.deps})"
+
+
+def validate_dag(stages: list[Stage]) -> list[str]:
+    """
+    Checks names are unique and dependencies exist and don't loop.
+
+    Returns:
+        list: stage names in a topological order.
+    """
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage '{stage.name}'.")
+        by_name[stage.name] = stage
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown {unknown}.")
+
+    order, done = [], set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(dep in done for dep in s.deps)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between {[s.name for s in remaining]}.")
+        for stage in ready:
+            order.append(stage.name)
+            done.add(stage.name)
+        remaining = [s for s in remaining if s.name not in done]
+    return order
+
+
+def run_dag(
+    stages: list[Stage],
+    checkpoints=None,
+    resume: bool = False,
+    max_workers: int = PIPELINE_WORKERS,
+) -> dict:
+    """
+    Runs every stage as soon as its dependencies are done, independent stages
+    concurrently in threads.
+
+    Each output is saved to `checkpoints` (a CheckpointStore) as its stage
+    completes. With `resume`, stages already checkpointed there are skipped
+    and their saved output is handed to the stages that depend on them.
+
+    After a failure no new stage starts; those already running finish (and are
+    checkpointed), then the first error is raised.
+
+    Returns:
+        dict: output of every stage, by name.
+    """
+    order = validate_dag(stages)
+    by_name = {stage.name: stage for stage in stages}
+    outputs = {}
+    if resume and checkpoints is not None:
+        for name in order:
+            found, output = checkpoints.load(name)
+            if found:
+                outputs[name] = output
+                incr("stages_resumed")
+                logger.info(f"⏭️ Resuming past stage '{name}' from its checkpoint.")
+
+    pending = [name for name in order if name not in outputs]
+    running = {}  # future -> stage name
+    error = None
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="stage") as pool:
+        while pending or running:
+            if error is None:
+                for name in [
+                    n for n in pending if set(by_name[n].deps) <= outputs.keys()
+                ]:
+                    pending.remove(name)
+                    inputs = [outputs[dep] for dep in by_name[name].deps]
+                    future = pool.submit(_run_stage, by_name[name], inputs, checkpoints)
+                    running[future] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Stage '{name}' failed: {e}")
+                    error = error or e
+
+    if error is not None:
+        raise error
+    return outputs
+
+
+def _run_stage(stage: Stage, inputs: list, checkpoints):
+    logger.info(f"▶️ Stage '{stage.name}' started.")
+    with span("stage", stage=stage.name):
+        output = stage.fn(*inputs)
+    if checkpoints is not None:
+        checkpoints.save(stage.name, output)
+    logger.info(f"✅ Stage '{stage.name}' done.")
+    return output
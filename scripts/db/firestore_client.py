@@ -0,0 +1,14 @@
+import functools
+
+
+@functools.lru_cache(maxsize=1)
+def get_firestore_client():
+    """
+    Process-wide Firestore client, shared by every session and flush.
+
+    google.cloud.firestore is imported here, on first use, so the app starts
+    without paying for it.
+    """
+    from google.cloud import firestore
+
+    return firestore.Client()
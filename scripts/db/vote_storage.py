@@ -1,6 +1,15 @@
+import os
+import time
+import heapq
+import queue
+import atexit
 import logging
-from google.cloud import firestore
+import functools
+import itertools
+import threading
 from datetime import datetime, timezone
+from .firestore_client import get_firestore_client
+from .vote_tally import add_tally_increments
 
 # basic logging config
 logging.basicConfig(
@@ -8,12 +17,151 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# write-behind settings: flush when a batch fills up or after the interval
+VOTE_BATCH_SIZE = min(int(os.getenv("VOTE_BATCH_SIZE", "50")), 500)
+VOTE_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL", "2"))
+# failed votes wait base * 2^(attempt - 1), capped, and are retried until shutdown
+VOTE_RETRY_BASE_DELAY = float(os.getenv("VOTE_RETRY_BASE_DELAY", "1"))
+VOTE_RETRY_MAX_DELAY = float(os.getenv("VOTE_RETRY_MAX_DELAY", "60"))
+
+
+class VoteBuffer:
+    """
+    Write-behind queue for votes.
+
+    `put` only enqueues, so the UI thread never waits on Firestore. A
+    background thread commits queued votes in batched writes once
+    `batch_size` votes are waiting or `flush_interval` seconds have passed,
+    and drains the queue on shutdown.
+
+    Votes of a failed flush are retried with an exponential backoff, for as
+    long as the process lives; only those still failing in the final drain
+    are dropped.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self.dropped = 0
+        self.last_flush_latency = None
+        self._queue = queue.Queue()
+        # (not before, tie-breaker, vote, attempts), only touched by the writer
+        self._retries = []
+        self._retry_order = itertools.count()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="vote-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, vote: dict):
+        self._queue.put((vote, 1))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._retries)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "flushed": self.flushed,
+            "retrying": len(self._retries),
+            "dropped": self.dropped,
+            "last_flush_latency_s": self.last_flush_latency,
+        }
+
+    def close(self, timeout: float = 10.0):
+        """Stops the writer once everything still queued has been flushed."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not (
+            self._stopped.is_set() and self._queue.empty() and not self._retries
+        ):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _next_batch(self) -> list:
+        batch = self._due_retries()
+        deadline = time.monotonic() + self.flush_interval
+        if self._retries:
+            # wake up for the next retry even if nothing new arrives
+            deadline = min(deadline, self._retries[0][0])
+        while len(batch) < self.batch_size:
+            # once stopping, drain without waiting
+            timeout = 0 if self._stopped.is_set() else deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _due_retries(self) -> list:
+        # once stopping, every vote left gets its last attempt now
+        now = float("inf") if self._stopped.is_set() else time.monotonic()
+        due = []
+        while self._retries and self._retries[0][0] <= now:
+            if len(due) == self.batch_size:
+                break
+            _, _, vote, attempts = heapq.heappop(self._retries)
+            due.append((vote, attempts))
+        return due
+
+    def _flush(self, batch: list):
+        start = time.perf_counter()
+        try:
+            db = get_firestore_client()
+            writes = db.batch()
+            for vote, _ in batch:
+                writes.set(db.collection("votes").document(), vote)
+            add_tally_increments(writes, db, [vote["votes"] for vote, _ in batch])
+            writes.commit()
+        except Exception as e:
+            if self._stopped.is_set():
+                self.dropped += len(batch)
+                logger.error(f"❌ Dropping {len(batch)} vote(s) at shutdown: {e}")
+                return
+            logger.warning(f"⚠️ Failed to flush {len(batch)} vote(s), retrying: {e}")
+            for vote, attempts in batch:
+                delay = min(
+                    VOTE_RETRY_BASE_DELAY * 2 ** (attempts - 1), VOTE_RETRY_MAX_DELAY
+                )
+                heapq.heappush(
+                    self._retries,
+                    (
+                        time.monotonic() + delay,
+                        next(self._retry_order),
+                        vote,
+                        attempts + 1,
+                    ),
+                )
+            return
+
+        self.last_flush_latency = time.perf_counter() - start
+        self.flushed += len(batch)
+        logger.info(
+            f"Successfully recorded {len(batch)} user vote(s) "
+            f"in {self.last_flush_latency:.3f}s."
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def get_vote_buffer() -> VoteBuffer:
+    return VoteBuffer(VOTE_BATCH_SIZE, VOTE_FLUSH_INTERVAL)
+
 
 def store_vote(vote_list):
-    db = firestore.Client()
-    db.collection("votes").add(
-        {"timestamp": datetime.now(timezone.utc), "votes": vote_list}
-    )
+    """Queues a vote; it is written to Firestore in the background."""
+    get_vote_buffer().put({"timestamp": datetime.now(timezone.utc), "votes": vote_list})
 
 
-logger.info("Successfully recorded user votes.")
+def vote_buffer_stats() -> dict:
+    """Queue depth and flush latency of the write-behind buffer."""
+    return get_vote_buffer().stats()
@@ -0,0 +1,136 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from .firestore_client import get_firestore_client
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Tallies live in `vote_tallies/shard_{i}` as {"counts": {title: n}, "ballots": n}.
+# Writers spread increments over the shards, readers sum them in one get_all.
+VOTE_TALLY_COLLECTION = "vote_tallies"
+VOTE_TALLY_SHARDS = int(os.getenv("VOTE_TALLY_SHARDS", "10"))
+VOTE_TALLY_CACHE_TTL = float(os.getenv("VOTE_TALLY_CACHE_TTL", "30"))
+
+_cache_lock = threading.Lock()
+_cached_counts = None
+_cached_at = 0.0
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def _shard_refs(db):
+    collection = db.collection(VOTE_TALLY_COLLECTION)
+    return [collection.document(f"shard_{i}") for i in range(VOTE_TALLY_SHARDS)]
+
+
+def add_tally_increments(writes, db, vote_lists: list[list[str]]):
+    """
+    Adds the counter updates for `vote_lists` to the write batch `writes`, so
+    they are committed atomically with the votes themselves.
+    """
+    from google.cloud import firestore
+
+    counts = Counter(title for votes in vote_lists for title in votes)
+    shard = random.choice(_shard_refs(db))
+    writes.set(
+        shard,
+        {
+            "counts": {title: firestore.Increment(n) for title, n in counts.items()},
+            "ballots": firestore.Increment(len(vote_lists)),
+        },
+        merge=True,
+    )
+
+
+def get_vote_counts(use_cache: bool = True, wait: bool = True) -> dict[str, int]:
+    """
+    Per-poem vote counts, read from the shards (cached for a few seconds).
+
+    With `wait=False` it never touches Firestore on the caller's thread: it
+    returns the last counts (None before the first read) and refreshes them
+    in the background once they are stale.
+    """
+    global _cached_counts, _cached_at
+    if not wait:
+        if (
+            _cached_counts is None
+            or time.monotonic() - _cached_at >= VOTE_TALLY_CACHE_TTL
+        ):
+            _refresh_in_background()
+        return _cached_counts
+
+    with _cache_lock:
+        if (
+            use_cache
+            and _cached_counts is not None
+            and time.monotonic() - _cached_at < VOTE_TALLY_CACHE_TTL
+        ):
+            return _cached_counts
+
+        db = get_firestore_client()
+        counts = Counter()
+        for snapshot in db.get_all(_shard_refs(db)):
+            if snapshot.exists:
+                counts.update(snapshot.to_dict().get("counts", {}))
+
+        _cached_counts = dict(counts)
+        _cached_at = time.monotonic()
+        return _cached_counts
+
+
+def _refresh_in_background():
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(
+            target=_refresh_counts, name="vote-tally-refresh", daemon=True
+        )
+        _refresh_thread.start()
+
+
+def _refresh_counts():
+    try:
+        get_vote_counts(use_cache=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not refresh vote tallies, keeping the last: {e}")
+
+
+def get_poem_votes(title: str) -> int:
+    return get_vote_counts().get(title, 0)
+
+
+def get_leaderboard(top_n: int = 3, wait: bool = True) -> list[tuple[str, int]]:
+    """Top-N poems as (title, votes), most voted first (see `get_vote_counts`)."""
+    return Counter(get_vote_counts(wait=wait) or {}).most_common(top_n)
+
+
+def rebuild_tallies():
+    """
+    Recounts every stored vote into the shards. Run once to backfill votes
+    recorded before the counters existed.
+    """
+    db = get_firestore_client()
+    vote_lists = [
+        doc.to_dict().get("votes", []) for doc in db.collection("votes").stream()
+    ]
+    counts = Counter(title for votes in vote_lists for title in votes)
+
+    writes = db.batch()
+    for i, shard in enumerate(_shard_refs(db)):
+        data = {"counts": dict(counts), "ballots": len(vote_lists)} if i == 0 else {}
+        writes.set(shard, {"counts": {}, "ballots": 0, **data})
+    writes.commit()
+    logger.info(f"Rebuilt vote tallies from {len(vote_lists)} vote(s).")
+
+
+# python -m scripts.db.vote_tally
+if __name__ == "__main__":
+    rebuild_tallies()
@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import threading
+import contextlib
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+GCS_PREFIX_METRICS = "data/metrics/"
+METRIC_NAMESPACE = "poems"
+# spans kept per process; the app imports instrumented modules too
+METRICS_MAX_SPANS = int(os.getenv("METRICS_MAX_SPANS", "10000"))
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def process_uptime() -> float | None:
+    """Seconds since this process started (Linux only), None elsewhere."""
+    try:
+        with open("/proc/self/stat") as f:
+            # start time is field 22; the command name before it may hold spaces
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    # clock ticks are 10ms, so are the results
+    return round(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 2)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, _labels(labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_line(name: str, labels: tuple, value) -> str:
+    label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}"
+
+
+class RunMetrics:
+    """
+    Spans, counters, gauges and observations for one pipeline run.
+
+    Span CPU time is process-wide (it includes worker threads), so spans that
+    overlap in time also share CPU time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = datetime.datetime.now(datetime.timezone.utc)
+            self._start_wall = time.perf_counter()
+            self._start_cpu = time.process_time()
+            self.spans = deque(maxlen=METRICS_MAX_SPANS)
+            self.counters = {}
+            self.gauges = {}
+            self.observations = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str, **labels):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            record = {
+                "name": name,
+                "labels": {k: str(v) for k, v in labels.items()},
+                "status": status,
+                "offset_seconds": round(start_wall - self._start_wall, 4),
+                "wall_seconds": round(time.perf_counter() - start_wall, 4),
+                "cpu_seconds": round(time.process_time() - start_cpu, 4),
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+            with self._lock:
+                self.spans.append(record)
+            logger.debug(
+                f"{name}: {record['wall_seconds']}s wall, "
+                f"{record['cpu_seconds']}s CPU"
+            )
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            stats = self.observations.setdefault(
+                key, {"count": 0, "sum": 0, "min": value, "max": value}
+            )
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started.isoformat(),
+                "finished": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "wall_seconds": round(time.perf_counter() - self._start_wall, 4),
+                "cpu_seconds": round(time.process_time() - self._start_cpu, 4),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "spans": list(self.spans),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.gauges.items()
+                ],
+                "observations": [
+                    {"name": name, "labels": dict(labels), **stats}
+                    for (name, labels), stats in self.observations.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format; spans are aggregated by name/labels."""
+        report = self.to_dict()
+        families = {}
+
+        def add(name, kind, labels, value, suffix=""):
+            family = families.setdefault(f"{METRIC_NAMESPACE}_{name}", (kind, []))
+            family[1].append((suffix, labels, value))
+
+        add("run_wall_seconds", "gauge", (), report["wall_seconds"])
+        add("run_cpu_seconds", "gauge", (), report["cpu_seconds"])
+        if report["peak_rss_bytes"] is not None:
+            add("run_peak_rss_bytes", "gauge", (), report["peak_rss_bytes"])
+
+        spans = {}
+        for record in report["spans"]:
+            labels = _labels({"span": record["name"], **record["labels"]})
+            totals = spans.setdefault(labels, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += record["wall_seconds"]
+            totals[2] += record["cpu_seconds"]
+            totals[3] = max(totals[3], record["peak_rss_bytes"] or 0)
+        for labels, (count, wall, cpu, rss) in spans.items():
+            add("span_count", "counter", labels, count)
+            add("span_wall_seconds_total", "counter", labels, round(wall, 4))
+            add("span_cpu_seconds_total", "counter", labels, round(cpu, 4))
+            add("span_peak_rss_bytes", "gauge", labels, rss)
+
+        for entry in report["counters"]:
+            labels = _labels(entry["labels"])
+            add(f"{entry['name']}_total", "counter", labels, entry["value"])
+        for entry in report["gauges"]:
+            add(entry["name"], "gauge", _labels(entry["labels"]), entry["value"])
+        for entry in report["observations"]:
+            name, labels = entry["name"], _labels(entry["labels"])
+            add(name, "summary", labels + (("quantile", "0"),), entry["min"])
+            add(name, "summary", labels + (("quantile", "1"),), entry["max"])
+            add(name, "summary", labels, entry["sum"], suffix="_sum")
+            add(name, "summary", labels, entry["count"], suffix="_count")
+
+        lines = []
+        for family, (kind, samples) in sorted(families.items()):
+            lines.append(f"# TYPE {family} {kind}")
+            lines.extend(
+                _prometheus_line(family + suffix, labels, value)
+                for suffix, labels, value in samples
+            )
+        return "\n".join(lines) + "\n"
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics() -> RunMetrics:
+    """The process-wide metrics of the current run."""
+    return _metrics
+
+
+def span(name: str, **labels):
+    return _metrics.span(name, **labels)
+
+
+def incr(name: str, value: float = 1, **labels):
+    _metrics.incr(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    _metrics.observe(name, value, **labels)
+
+
+def upload_metrics_report(bucket_name: str, prefix: str = GCS_PREFIX_METRICS):
+    """
+    Uploads the run's report as JSON and in Prometheus text format, and points
+    `{prefix}LATEST` at the JSON one.
+
+    Returns:
+        str: Name of the uploaded JSON blob.
+    """
+    from .text_process.gcs_client import get_storage_client
+    from .text_process.manifest import write_latest_manifest
+
+    bucket = get_storage_client().bucket(bucket_name)
+    date = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    filename = f"{prefix}run_metrics_{date}"
+
+    data = json.dumps(_metrics.to_dict(), indent=2).encode("utf-8")
+    blob = bucket.blob(f"{filename}.json")
+    blob.upload_from_string(data, content_type="application/json")
+    bucket.blob(f"{filename}.prom").upload_from_string(
+        _metrics.to_prometheus(), content_type="text/plain; version=0.0.4"
+    )
+    write_latest_manifest(bucket, prefix, blob, data)
+    logger.info(f"Uploaded run metrics {filename}.json/.prom to GCS.")
+    return blob.name
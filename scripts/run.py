@@ -1,13 +1,35 @@
 import os
 import sys
+import asyncio
 import logging
+import argparse
+import threading
 from dotenv import load_dotenv
 from .text_process.gdocs_import import GDocsImporter
 from .text_process.gcs_export import upload_collection
 from .text_process.gcs_export_nlp import upload_output
 from .text_process.gcs_import import download_collection
-from .transformers.emoji_classifier_en import run_emoji_analysis
-from .transformers.llm_interpreter import run_gpt_analysis
+from .text_process.gcs_import_nlp import fetch_latest_blob_from_gcs, load_json_from_gcs
+from .text_process.view_model import build_view_model
+from .text_process.run_manifest import (
+    fingerprint_collection,
+    export_fingerprint,
+    collection_fingerprint,
+    stale_poems,
+    load_run_manifest,
+    save_run_manifest,
+)
+from .text_process.checkpoints import (
+    CheckpointStore,
+    new_run_id,
+    latest_run_id,
+    clear_checkpoints,
+)
+from .transformers.emoji_classifier_en import run_emoji_analysis, model_version
+from .transformers.llm_interpreter import run_gpt_analysis_async, prompt_version
+from .transformers.embeddings import run_related_analysis, embedding_version
+from .metrics import span, set_gauge, upload_metrics_report
+from .dag import Stage, run_dag, PIPELINE_WORKERS
 
 load_dotenv()
 
@@ -23,14 +45,33 @@ GOOGLE_CLOUD_CREDS_PATH = os.getenv(
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = GOOGLE_CLOUD_CREDS_PATH
 SCOPES = os.getenv("GOOGLE_DOC_SCOPES", "").split(",")
 DOC_ID = os.getenv("GOOGLE_DOC_ID")
+# the collection can be spread across several docs, imported concurrently
+DOC_IDS = [d for d in os.getenv("GOOGLE_DOC_IDS", DOC_ID or "").split(",") if d]
 BUCKET_NAME = os.getenv("GCS_BUCKET")
 # GCS folder
 GCS_PREFIX = "data/poems/"
 GCS_PREFIX_LLM = "data/llm/"
 GCS_PREFIX_EMOJI = "data/emoji/"
+GCS_PREFIX_VIEW = "data/view/"
+GCS_PREFIX_RELATED = "data/related/"
+GCS_SNAPSHOT_PREFIX = "data/snapshots/poems/"
+# "snapshot" (one bundled object per run) or "per_poem" (legacy layout)
+GCS_LAYOUT = os.getenv("GCS_LAYOUT", "snapshot")
+SNAPSHOT_PREFIX = GCS_SNAPSHOT_PREFIX if GCS_LAYOUT == "snapshot" else None
+# concurrent GCS uploads/downloads
+GCS_UPLOAD_WORKERS = int(os.getenv("GCS_UPLOAD_WORKERS", "8"))
+GCS_DOWNLOAD_WORKERS = int(os.getenv("GCS_DOWNLOAD_WORKERS", "8"))
+# the analysis branches run concurrently: merging and saving their manifest
+# entries must not interleave
+_manifest_lock = threading.Lock()
 
 
 def validate_poem_parse(poems: list[dict]) -> None:
+    with span("validate"):
+        _validate_poem_parse(poems)
+
+
+def _validate_poem_parse(poems: list[dict]) -> None:
     invalid = []
     for poem in poems:
         title = poem.get("title")
@@ -49,38 +90,324 @@ def validate_poem_parse(poems: list[dict]) -> None:
         logger.info("✅ All poems passed validation.")
 
 
-if __name__ == "__main__":
+def load_previous_output(prefix: str) -> dict:
     try:
-        # import poems from GDocs, parse and validate
-        logger.info("📄 Starting GDocs import...")
+        return load_json_from_gcs(
+            BUCKET_NAME, fetch_latest_blob_from_gcs(BUCKET_NAME, prefix)
+        )
+    except FileNotFoundError:
+        return {}
 
-        importer = GDocsImporter(
-            creds_path=GOOGLE_DOCS_CREDS_PATH, scopes=SCOPES, doc_id=DOC_ID
+
+def download_stage() -> list[dict]:
+    with span("gcs_download", layout=GCS_LAYOUT):
+        collection = download_collection(
+            GCS_PREFIX,
+            BUCKET_NAME,
+            max_workers=GCS_DOWNLOAD_WORKERS,
+            snapshot_prefix=SNAPSHOT_PREFIX,
         )
+    set_gauge("downloaded", len(collection))
+    logger.info("🎉 Done! Poems downloaded.")
+    return collection
 
-        documents = importer.fetch_google_doc(DOC_ID)
-        poems = importer.parse_google_doc(documents)
-        validate_poem_parse(poems)
 
-        # store poems in GCS bucket
-        logger.info(f"✅ Parsed {len(poems)} poems. Uploading to GCS...")
-        upload_collection(poems, GCS_PREFIX, BUCKET_NAME)
+def import_stage(importer: GDocsImporter, run_manifest: dict):
+    """
+    Imports new/changed poems from every doc and completes the collection with
+    the unchanged poems already stored in GCS.
+
+    Returns:
+        tuple: (full collection, new GDocs state to record once exported).
+    """
+    state = run_manifest.get("gdocs", {})
+    with span("gdocs_import", docs=len(DOC_IDS)):
+        changed, slugs, gdocs_state = importer.import_documents(DOC_IDS, state)
+    validate_poem_parse(changed)
+    set_gauge("changed", len(changed))
+    set_gauge("collection_size", len(slugs))
+
+    by_slug = {poem["slug"]: poem for poem in changed}
+    if len(by_slug) < len(slugs):
+        previous = {poem["slug"]: poem for poem in download_stage()}
+        known = by_slug.keys() | previous.keys()
+        missing = [slug for slug in slugs if slug not in known]
+        if missing:
+            logger.warning(
+                f"⚠️ {len(missing)} unchanged poem(s) missing from GCS, "
+                "re-importing everything."
+            )
+            with span("gdocs_import", docs=len(DOC_IDS), full="true"):
+                changed, slugs, gdocs_state = importer.import_documents(DOC_IDS, {})
+            validate_poem_parse(changed)
+            set_gauge("changed", len(changed))
+            by_slug = {poem["slug"]: poem for poem in changed}
+        else:
+            by_slug = previous | by_slug
+
+    return [by_slug[slug] for slug in slugs], gdocs_state
+
+
+def export_stage(poems: list[dict], fingerprints: dict, run_manifest: dict):
+    """
+    Uploads new/changed poems; skipped when the collection is unchanged.
+
+    Returns:
+        dict: slug -> error for every poem that failed to upload.
+    """
+    state = run_manifest.get("export", {})
+    changed = stale_poems(poems, fingerprints, state, GCS_LAYOUT)
+    removed = set(state.get("poems", {})) - set(fingerprints)
+    if not changed and not removed:
+        logger.info("⏭️ Collection unchanged, skipping GCS upload.")
+        return {}
+
+    with span("gcs_export", layout=GCS_LAYOUT):
+        if GCS_LAYOUT == "snapshot":
+            # the snapshot bundles the whole collection, so any change rewrites it
+            failed = upload_collection(
+                poems,
+                GCS_PREFIX,
+                BUCKET_NAME,
+                max_workers=GCS_UPLOAD_WORKERS,
+                snapshot_prefix=GCS_SNAPSHOT_PREFIX,
+            )
+        else:
+            logger.info(f"Uploading {len(changed)} new or changed poem(s)...")
+            failed = upload_collection(
+                changed, GCS_PREFIX, BUCKET_NAME, max_workers=GCS_UPLOAD_WORKERS
+            )
+    set_gauge("upload_failures", len(failed))
+
+    if failed:
+        logger.warning(f"⚠️ Continuing without {len(failed)} failed upload(s).")
+    else:
         logger.info("🎉 Done! Poems uploaded.")
+    run_manifest["export"] = {
+        "version": GCS_LAYOUT,
+        "poems": {slug: fp for slug, fp in fingerprints.items() if slug not in failed},
+    }
+    return failed
+
+
+def exported_gdocs_state(gdocs_state: dict, failed: dict) -> dict:
+    """
+    The GDocs state to record after an export: docs with a failed upload lose
+    their revision and the failed poems' hashes, so the next run fetches them
+    again instead of completing the collection with the stale GCS copy.
+    """
+    state = {}
+    for doc_id, doc_state in gdocs_state.items():
+        poems = {s: h for s, h in doc_state["poems"].items() if s not in failed}
+        if len(poems) < len(doc_state["poems"]):
+            state[doc_id] = {"revision_id": None, "poems": poems}
+        else:
+            state[doc_id] = doc_state
+    return state
+
+
+def emoji_stage(collection: list[dict], fingerprints: dict, run_manifest: dict):
+    """Scores new/changed poems and merges them with the previous scores."""
+    state = run_manifest.get("emoji", {})
+    version = model_version()
+    stale = stale_poems(collection, fingerprints, state, version)
+    removed = set(state.get("poems", {})) - set(fingerprints)
+    if not stale and not removed:
+        logger.info("⏭️ No poem changed, skipping emoji analysis.")
+        return load_previous_output(GCS_PREFIX_EMOJI)
+
+    stale_slugs = {poem["slug"] for poem in stale}
+    previous = (
+        load_previous_output(GCS_PREFIX_EMOJI) if len(stale) < len(collection) else {}
+    )
+    emoji_output = {
+        slug: result
+        for slug, result in previous.items()
+        if slug in fingerprints and slug not in stale_slugs
+    }
+    logger.info(f"😶 Scoring {len(stale)} poem(s), reusing {len(emoji_output)}.")
+    set_gauge("scored", len(stale))
+    with span("emoji"):
+        emoji_output.update(run_emoji_analysis(stale))
+
+    upload_output(emoji_output, "emoji", GCS_PREFIX_EMOJI, BUCKET_NAME)
+    logger.info("🚀 All processing complete. Emoji outputs saved to GCS.")
+    run_manifest["emoji"] = {"version": version, "poems": dict(fingerprints)}
+    return emoji_output
+
+
+def llm_stage(collection: list[dict], fingerprints: dict, run_manifest: dict):
+    """Prompts cover the whole collection, so any change reruns all of them."""
+    state = run_manifest.get("llm", {})
+    version = prompt_version()
+    fingerprint = collection_fingerprint(fingerprints)
+    if state.get("version") == version and state.get("collection") == fingerprint:
+        logger.info("⏭️ Collection and prompts unchanged, skipping GPT analysis.")
+        return load_previous_output(GCS_PREFIX_LLM)
 
-        # download poems from GCS bucket
-        collection = download_collection(GCS_PREFIX, BUCKET_NAME)
-        logger.info("🎉 Done! Poems downloaded.")
+    with span("llm"):
+        llm_output = asyncio.run(run_gpt_analysis_async(collection))
+    upload_output(llm_output, "llm", GCS_PREFIX_LLM, BUCKET_NAME)
+    logger.info("🚀 All processing complete. llm outputs saved to GCS.")
+    run_manifest["llm"] = {"version": version, "collection": fingerprint}
+    return llm_output
 
+
+def related_stage(collection: list[dict], fingerprints: dict, run_manifest: dict):
+    """
+    Neighbors span the whole collection, so any change recomputes the table;
+    embeddings themselves are cached per poem body.
+    """
+    state = run_manifest.get("related", {})
+    version = embedding_version()
+    fingerprint = collection_fingerprint(fingerprints)
+    if state.get("version") == version and state.get("collection") == fingerprint:
+        logger.info("⏭️ Collection and model unchanged, skipping related poems.")
+        return load_previous_output(GCS_PREFIX_RELATED)
+
+    with span("related"):
+        related_output = run_related_analysis(collection)
+    upload_output(related_output, "related", GCS_PREFIX_RELATED, BUCKET_NAME)
+    logger.info("🧭 Related poems saved to GCS.")
+    run_manifest["related"] = {"version": version, "collection": fingerprint}
+    return related_output
+
+
+def view_stage(
+    collection: list[dict], emoji_output: dict, llm_output: dict, related_output: dict
+):
+    """Parses and pre-renders everything the app shows into one artifact."""
+    llm_path = fetch_latest_blob_from_gcs(BUCKET_NAME, GCS_PREFIX_LLM)
+    with span("view_model"):
+        view_model = build_view_model(
+            collection, llm_output, emoji_output, llm_path, related_output
+        )
+    upload_output(view_model, "view", GCS_PREFIX_VIEW, BUCKET_NAME)
+    logger.info("🖼️ View model saved to GCS.")
+
+
+def analysis_stage(stage_fn, key: str, collection: list[dict], run_manifest: dict):
+    """
+    Runs one of the concurrent analysis stages on its own copy of the run
+    manifest, then merges its entry back and saves the manifest.
+    """
+    if not collection:
+        return {}
+    with _manifest_lock:
+        own_manifest = dict(run_manifest)
+    output = stage_fn(collection, fingerprint_collection(collection), own_manifest)
+    with _manifest_lock:
+        if key in own_manifest:
+            run_manifest[key] = own_manifest[key]
+        save_run_manifest(run_manifest, BUCKET_NAME)
+    return output
+
+
+def pipeline_stages(run_manifest: dict, make_importer) -> list[Stage]:
+    """
+    The run as a DAG: import -> export -> download, then the emoji, GPT and
+    related-poems branches side by side, and the view model once all three
+    are done. `make_importer` is only called when the import actually runs.
+    """
+
+    def gdocs():
+        # import new/changed poems from GDocs, parse and validate
+        logger.info("📄 Starting GDocs import...")
+        poems, gdocs_state = import_stage(make_importer(), run_manifest)
+        return {"poems": poems, "gdocs": gdocs_state}
+
+    def export(imported):
+        # store new/changed poems in GCS bucket
+        poems = imported["poems"]
+        logger.info(f"✅ Parsed {len(poems)} poems. Uploading to GCS...")
+        failed = export_stage(
+            poems, fingerprint_collection(poems, export_fingerprint), run_manifest
+        )
+        run_manifest["gdocs"] = exported_gdocs_state(imported["gdocs"], failed)
+        save_run_manifest(run_manifest, BUCKET_NAME)
+
+    def collection(_):
+        return download_stage()
+
+    def view(collection, emoji_output, llm_output, related_output):
         if collection:
-            # emoji analys over English poems
-            emoji_output = run_emoji_analysis(collection)
-            upload_output(emoji_output, "emoji", GCS_PREFIX_EMOJI, BUCKET_NAME)
-            logger.info("🚀 All processing complete. Emoji outputs saved to GCS.")
-
-            # gpt related anaysis
-            llm_output = run_gpt_analysis(collection)
-            upload_output(llm_output, "llm", GCS_PREFIX_LLM, BUCKET_NAME)
-            logger.info("🚀 All processing complete. llm outputs saved to GCS.")
+            view_stage(collection, emoji_output, llm_output, related_output)
+
+    return [
+        Stage("gdocs", gdocs),
+        Stage("export", export, deps=("gdocs",)),
+        Stage("collection", collection, deps=("export",)),
+        # emoji analysis, one model per language
+        Stage(
+            "emoji",
+            lambda c: analysis_stage(emoji_stage, "emoji", c, run_manifest),
+            deps=("collection",),
+        ),
+        # gpt related analysis
+        Stage(
+            "llm",
+            lambda c: analysis_stage(llm_stage, "llm", c, run_manifest),
+            deps=("collection",),
+        ),
+        # nearest neighbors from local embeddings
+        Stage(
+            "related",
+            lambda c: analysis_stage(related_stage, "related", c, run_manifest),
+            deps=("collection",),
+        ),
+        # pre-rendered view model for the app
+        Stage("view", view, deps=("collection", "emoji", "llm", "related")),
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import the poems, analyze them and publish the results."
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Skip the stages a failed run already completed "
+        "(the latest failed run, or RUN_ID).",
+    )
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_id = None
+    if args.resume:
+        run_id = latest_run_id(BUCKET_NAME) if args.resume == "latest" else args.resume
+        if run_id is None:
+            logger.info("No failed run to resume, starting a new one.")
+    checkpoints = CheckpointStore(BUCKET_NAME, run_id or new_run_id())
+    logger.info(f"Run {checkpoints.run_id}: resume it with --resume if it fails.")
+
+    run_manifest = load_run_manifest(BUCKET_NAME)
+    stages = pipeline_stages(
+        run_manifest,
+        lambda: GDocsImporter(
+            creds_path=GOOGLE_DOCS_CREDS_PATH, scopes=SCOPES, doc_id=DOC_ID
+        ),
+    )
+    run_dag(stages, checkpoints, resume=run_id is not None, max_workers=args.workers)
+    # nothing left to resume, older failed runs included
+    clear_checkpoints(BUCKET_NAME)
+
+
+# python -m scripts.run [--resume [RUN_ID]]
+if __name__ == "__main__":
+    try:
+        main()
     except Exception as e:
         logger.exception(f"Fatal error: {e}")
         sys.exit(1)
+    finally:
+        # also on failure: a failed run is the one worth looking at
+        try:
+            upload_metrics_report(BUCKET_NAME)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not upload run metrics: {e}")
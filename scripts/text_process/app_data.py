@@ -0,0 +1,142 @@
+import os
+import logging
+import datetime
+from dotenv import load_dotenv
+from .codec import encode, decode
+from .view_model import build_view_model
+
+# The GCS modules (and the google-cloud clients behind them) are imported on
+# first use: a cold start paints from the baked snapshot without them.
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# GCS folders the app reads
+GCS_PREFIX = "data/poems/"
+GCS_SNAPSHOT_PREFIX = "data/snapshots/poems/"
+GCS_PREFIX_LLM = "data/llm/"
+GCS_PREFIX_EMOJI = "data/emoji/"
+GCS_PREFIX_RELATED = "data/related/"
+GCS_PREFIX_VIEW = "data/view/"
+# view model baked into the image at build time, served until GCS answers
+APP_SNAPSHOT_PATH = os.getenv("APP_SNAPSHOT_PATH", "data/app_snapshot.json")
+
+
+def load_latest_outputs(bucket_name: str):
+    from .gcs_import_nlp import load_json_from_gcs, fetch_latest_blob_from_gcs
+
+    llm_path = fetch_latest_blob_from_gcs(bucket_name, GCS_PREFIX_LLM)
+    emoji_path = fetch_latest_blob_from_gcs(bucket_name, GCS_PREFIX_EMOJI)
+    return (
+        load_json_from_gcs(bucket_name, llm_path),
+        load_json_from_gcs(bucket_name, emoji_path),
+        llm_path,
+    )
+
+
+def load_related_output(bucket_name: str) -> dict:
+    from .gcs_import_nlp import load_json_from_gcs, fetch_latest_blob_from_gcs
+
+    try:
+        path = fetch_latest_blob_from_gcs(bucket_name, GCS_PREFIX_RELATED)
+    except FileNotFoundError:
+        return {}
+    return load_json_from_gcs(bucket_name, path)
+
+
+def get_poems(bucket_name: str):
+    from .gcs_import import download_collection
+
+    return download_collection(
+        GCS_PREFIX, bucket_name, snapshot_prefix=GCS_SNAPSHOT_PREFIX
+    )
+
+
+def load_app_data(bucket_name: str) -> dict:
+    """The app's view model, straight from the pipeline when it emitted one."""
+    from .gcs_import_nlp import load_json_from_gcs, fetch_latest_blob_from_gcs
+
+    try:
+        view_path = fetch_latest_blob_from_gcs(bucket_name, GCS_PREFIX_VIEW)
+        return load_json_from_gcs(bucket_name, view_path)
+    except FileNotFoundError:
+        # the pipeline hasn't emitted a view model yet, build it here once
+        llm_output, emoji_output, llm_path = load_latest_outputs(bucket_name)
+        return build_view_model(
+            get_poems(bucket_name),
+            llm_output,
+            emoji_output,
+            llm_path,
+            load_related_output(bucket_name),
+        )
+
+
+# generations of the pointers the app reads: a change means new data
+def app_data_version(bucket_name: str) -> tuple:
+    from .gcs_import_nlp import fetch_generation
+    from .manifest import LATEST_NAME
+    from .snapshot import INDEX_NAME
+
+    return tuple(
+        fetch_generation(bucket_name, path)
+        for path in (
+            f"{GCS_PREFIX_VIEW}{LATEST_NAME}",
+            f"{GCS_PREFIX_LLM}{LATEST_NAME}",
+            f"{GCS_PREFIX_EMOJI}{LATEST_NAME}",
+            f"{GCS_PREFIX_RELATED}{LATEST_NAME}",
+            f"{GCS_SNAPSHOT_PREFIX}{INDEX_NAME}",
+        )
+    )
+
+
+def bake_app_snapshot(bucket_name: str, path: str = APP_SNAPSHOT_PATH) -> dict:
+    """
+    Writes the current view model and its data version to `path`, for the
+    image build. The version is read first: data published in between only
+    makes the app's first background check load it again.
+    """
+    version = app_data_version(bucket_name)
+    view = load_app_data(bucket_name)
+    data, _, _ = encode(
+        {
+            "version": list(version),
+            "baked_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "view": view,
+        },
+        "json+gzip",
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+    logger.info(f"🍞 Baked app snapshot {version} to {path} ({len(data)} bytes).")
+    return view
+
+
+def load_app_snapshot(path: str = APP_SNAPSHOT_PATH):
+    """
+    The view model baked by `bake_app_snapshot`.
+
+    Returns:
+        tuple: (view model, data version), or (None, None) without a snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            snapshot = decode(f.read())
+        view, version = snapshot["view"], tuple(snapshot["version"])
+    except FileNotFoundError:
+        return None, None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable app snapshot {path}: {e}")
+        return None, None
+    logger.info(f"Serving app snapshot baked at {snapshot.get('baked_at')}.")
+    return view, version
+
+
+# python -m scripts.text_process.app_data  (before `docker build`)
+if __name__ == "__main__":
+    load_dotenv()
+    bake_app_snapshot(os.getenv("GCS_BUCKET"))
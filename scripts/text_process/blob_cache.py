@@ -0,0 +1,127 @@
+import os
+import logging
+import hashlib
+import tempfile
+import threading
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+GCS_CACHE_DIR = os.getenv(
+    "GCS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gcs_blob_cache")
+)
+GCS_CACHE_MAX_MB = int(os.getenv("GCS_CACHE_MAX_MB", "100"))
+# eviction frees down to this share of the budget, so it doesn't rescan per put
+GCS_CACHE_EVICT_TO = 0.9
+
+
+class BlobCache:
+    """
+    Local on-disk cache of GCS object contents.
+
+    Entries are keyed by blob name + generation (or etag), so a new version of
+    an object is a cache miss while unchanged objects are read from disk.
+    The directory is kept under `max_bytes` by evicting least recently used
+    entries. Its size is scanned once and then tracked as entries are added;
+    going over budget rescans it and evicts down to `GCS_CACHE_EVICT_TO` of
+    the budget. Caching is best effort: a failed write (e.g. a full disk) is
+    logged and skipped.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, name: str, version) -> str:
+        key = hashlib.sha256(f"{name}#{version}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, name: str, version) -> bytes | None:
+        path = self._path(name, version)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        # bump mtime so eviction is LRU rather than FIFO
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted since the read, the data is still good
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, name: str, version, data: bytes):
+        path = self._path(name, version)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            with self._lock:
+                try:
+                    previous = os.stat(path).st_size
+                except FileNotFoundError:
+                    previous = 0
+                os.replace(tmp_path, path)
+                self._bytes += len(data) - previous
+                over_budget = self._bytes > self.max_bytes
+        except OSError as e:
+            # a partial .tmp is never evicted: don't leave it filling the disk
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+            logger.warning(f"⚠️ Could not cache {name}: {e}")
+            return
+        if over_budget:
+            self.evict()
+
+    def _entries(self) -> list[tuple]:
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * GCS_CACHE_EVICT_TO
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._bytes = total
+
+
+_default_cache = None
+
+
+def get_default_cache() -> BlobCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BlobCache(GCS_CACHE_DIR, GCS_CACHE_MAX_MB * 1024 * 1024)
+    return _default_cache
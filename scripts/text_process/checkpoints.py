@@ -0,0 +1,107 @@
+import os
+import shutil
+import logging
+import datetime
+from google.api_core.exceptions import NotFound
+from .gcs_client import get_storage_client
+from .codec import encode, decode
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# data/checkpoints/<run id>/<stage>.json, kept until a run succeeds
+GCS_PREFIX_CHECKPOINTS = "data/checkpoints/"
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".cache/checkpoints")
+CHECKPOINT_CODEC = "json+gzip"
+
+
+def new_run_id() -> str:
+    """Sortable id of a new run: its UTC start time."""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def latest_run_id(bucket_name: str, local_dir: str = CHECKPOINT_DIR) -> str | None:
+    """Most recent run with checkpoints left, locally or in GCS (None if none)."""
+    runs = set()
+    if os.path.isdir(local_dir):
+        runs.update(entry.name for entry in os.scandir(local_dir) if entry.is_dir())
+    blobs = (
+        get_storage_client()
+        .bucket(bucket_name)
+        .list_blobs(prefix=GCS_PREFIX_CHECKPOINTS)
+    )
+    runs.update(
+        blob.name[len(GCS_PREFIX_CHECKPOINTS) :].split("/")[0] for blob in blobs
+    )
+    runs.discard("")
+    return max(runs, default=None)
+
+
+def clear_checkpoints(bucket_name: str, local_dir: str = CHECKPOINT_DIR):
+    """
+    Deletes the checkpoints of every run, once one has succeeded: a failed
+    run older than it must never be resumed over its newer outputs.
+    """
+    shutil.rmtree(local_dir, ignore_errors=True)
+    bucket = get_storage_client().bucket(bucket_name)
+    for blob in bucket.list_blobs(prefix=GCS_PREFIX_CHECKPOINTS):
+        blob.delete()
+
+
+class CheckpointStore:
+    """
+    Stage outputs of one run, written to local disk and mirrored to GCS.
+
+    Reads prefer the local copy and fall back to GCS, so a run can be resumed
+    on the machine it failed on or on a fresh one. A failed GCS write only
+    costs the mirror: the local checkpoint is still there.
+    """
+
+    def __init__(self, bucket_name: str, run_id: str, local_dir=CHECKPOINT_DIR):
+        self.bucket_name = bucket_name
+        self.run_id = run_id
+        self.local_dir = os.path.join(local_dir, run_id)
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.local_dir, f"{stage}.json")
+
+    def _blob(self, stage: str):
+        name = f"{GCS_PREFIX_CHECKPOINTS}{self.run_id}/{stage}.json"
+        return get_storage_client().bucket(self.bucket_name).blob(name)
+
+    def save(self, stage: str, output):
+        checkpoint = {
+            "run_id": self.run_id,
+            "stage": stage,
+            "saved": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "output": output,
+        }
+        data, content_type, content_encoding = encode(checkpoint, CHECKPOINT_CODEC)
+        os.makedirs(self.local_dir, exist_ok=True)
+        with open(f"{self._path(stage)}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{self._path(stage)}.tmp", self._path(stage))
+        try:
+            blob = self._blob(stage)
+            blob.content_encoding = content_encoding
+            blob.upload_from_string(data, content_type=content_type)
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint of '{stage}' only saved locally: {e}")
+
+    def load(self, stage: str):
+        """
+        Returns:
+            tuple: (found, output of the stage).
+        """
+        try:
+            with open(self._path(stage), "rb") as f:
+                return True, decode(f.read())["output"]
+        except FileNotFoundError:
+            pass
+        try:
+            return True, decode(self._blob(stage).download_as_bytes())["output"]
+        except NotFound:
+            return False, None
@@ -0,0 +1,88 @@
+import os
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# "<format>[+gzip]": format is json or msgpack (optional dependency)
+GCS_CODEC = os.getenv("GCS_CODEC", "json+gzip")
+GZIP_MAGIC = b"\x1f\x8b"
+UTF8_BOM = b"\xef\xbb\xbf"
+# below this, the gzip header and trailer outweigh what compression saves
+GZIP_MIN_BYTES = 256
+# extensions readers accept; older artifacts are all .json
+EXTENSIONS = (".json", ".msgpack")
+
+
+def _parse_codec(codec: str) -> tuple[str, bool]:
+    fmt, _, compression = codec.partition("+")
+    if fmt not in ("json", "msgpack") or compression not in ("", "gzip"):
+        raise ValueError(
+            f"Invalid codec '{codec}'. Expected 'json' or 'msgpack', "
+            "optionally followed by '+gzip'."
+        )
+    return fmt, compression == "gzip"
+
+
+def extension(codec: str = GCS_CODEC) -> str:
+    """File extension for objects written with `codec` (gzip is transparent)."""
+    fmt, _ = _parse_codec(codec)
+    return f".{fmt}"
+
+
+def encode(obj, codec: str = GCS_CODEC) -> tuple[bytes, str, str | None]:
+    """
+    Serializes `obj` with `codec`.
+
+    Returns:
+        tuple: (data, content type, content encoding or None).
+    """
+    fmt, compress = _parse_codec(codec)
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ImportError("The 'msgpack' codec needs `pip install msgpack`.")
+        data = msgpack.packb(obj, use_bin_type=True)
+        content_type = "application/msgpack"
+    else:
+        data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        content_type = "application/json"
+
+    if not compress or len(data) < GZIP_MIN_BYTES:
+        return data, content_type, None
+    # mtime=0 keeps the output deterministic for identical content
+    return gzip.compress(data, compresslevel=6, mtime=0), content_type, "gzip"
+
+
+def decode(data: bytes):
+    """
+    Deserializes bytes written by `encode`, or by the older pretty-printed JSON
+    writers. The format is detected from the content itself: GCS may or may
+    not have undone the gzip content-encoding on the way down.
+    """
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    # JSON text starts with ASCII (or a BOM); msgpack maps/arrays never do
+    if not data or data[0] < 0x80 or data.startswith(UTF8_BOM):
+        return json.loads(data)
+    if msgpack is None:
+        raise ImportError("This object is msgpack-encoded: `pip install msgpack`.")
+    return msgpack.unpackb(data, raw=False)
+
+
+def upload_encoded(blob, obj, codec: str = GCS_CODEC, **kwargs) -> bytes:
+    """
+    Uploads `obj` to `blob` with `codec`, setting the content type and (for
+    gzip) the content-encoding, so GCS serves it decompressed to plain clients.
+
+    Returns:
+        bytes: The stored payload.
+    """
+    data, content_type, content_encoding = encode(obj, codec)
+    blob.content_encoding = content_encoding
+    blob.upload_from_string(data, content_type=content_type, **kwargs)
+    return data
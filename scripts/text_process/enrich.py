@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# langdetect is random unless seeded; seeding at import covers the workers too
+DetectorFactory.seed = 0
+
+ENRICH_CACHE_PATH = os.getenv("ENRICH_CACHE_PATH", ".cache/enrich_cache.json")
+# oldest-used entries beyond this are dropped when the cache is saved
+ENRICH_CACHE_MAX_ENTRIES = int(os.getenv("ENRICH_CACHE_MAX_ENTRIES", "10000"))
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "0")) or None
+# below this many cache misses, a process pool costs more than it saves
+MIN_POOL_SIZE = 8
+
+
+def slugify(title: str) -> str:
+    title_str = (
+        unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("utf-8")
+    )
+    title_str = title_str.lower().strip()
+    title_str = title_str.replace("°", "no").replace(" ", "_")
+    return title_str
+
+
+def clean_body(raw_body: str) -> str:
+    return re.sub(r"[\s\x0b]+", " ", raw_body).strip()
+
+
+def detect_language(body: str) -> str:
+    try:
+        return detect(body)
+    except LangDetectException:
+        return "unknown"
+
+
+def body_hash(raw_body: str) -> str:
+    return hashlib.sha256(raw_body.encode("utf-8")).hexdigest()
+
+
+# Body-dependent enrichment, the part worth memoizing and parallelizing
+def enrich_body(raw_body: str) -> dict:
+    body = clean_body(raw_body)
+    return {"body": body, "language": detect_language(body)}
+
+
+def load_enrich_cache(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_enrich_cache(cache: dict, path: str, max_entries=ENRICH_CACHE_MAX_ENTRIES):
+    # entries are kept in order of last use: trim the least recently used
+    if len(cache) > max_entries:
+        cache = dict(list(cache.items())[len(cache) - max_entries :])
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def enrich_poems(
+    raw_poems: list[dict], max_workers=ENRICH_WORKERS, cache_path=ENRICH_CACHE_PATH
+) -> list[dict]:
+    """
+    Turns raw parsed sections ({"title", "date", "body"}) into poems with a slug,
+    a normalized body and a detected language.
+
+    Body results are memoized on disk by raw-body hash (up to
+    ENRICH_CACHE_MAX_ENTRIES, least recently used dropped first), and cache
+    misses are processed across a process pool.
+    """
+    cache = load_enrich_cache(cache_path) if cache_path else {}
+    hashes = [body_hash(raw["body"]) for raw in raw_poems]
+    misses = list(dict.fromkeys(h for h in hashes if h not in cache))
+    bodies = {h: raw["body"] for h, raw in zip(hashes, raw_poems)}
+
+    if len(misses) >= MIN_POOL_SIZE:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(enrich_body, [bodies[h] for h in misses], chunksize=4)
+            cache.update(zip(misses, results))
+    else:
+        cache.update((h, enrich_body(bodies[h])) for h in misses)
+
+    # move this call's entries to the end, the most recently used
+    for h in dict.fromkeys(hashes):
+        cache[h] = cache.pop(h)
+    if cache_path and misses:
+        save_enrich_cache(cache, cache_path)
+    logger.info(
+        f"Enriched {len(raw_poems)} poem(s), {len(raw_poems) - len(misses)} from cache."
+    )
+
+    return [
+        {
+            "title": raw["title"],
+            "slug": slugify(raw["title"]),
+            "date": raw.get("date"),
+            **cache[h],
+        }
+        for raw, h in zip(raw_poems, hashes)
+    ]
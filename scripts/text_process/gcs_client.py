@@ -0,0 +1,21 @@
+import os
+import functools
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+# size of the shared HTTP connection pool, should be >= the upload/download workers
+GCS_POOL_SIZE = int(os.getenv("GCS_POOL_SIZE", "32"))
+
+
+@functools.lru_cache(maxsize=1)
+def get_storage_client() -> storage.Client:
+    """
+    Returns a process-wide storage client.
+
+    The client (auth session + HTTP connection pool) is built once and reused by
+    every upload/download, with a pool large enough for concurrent workers.
+    """
+    client = storage.Client()
+    adapter = HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+    client._http.mount("https://", adapter)
+    return client
@@ -1,7 +1,11 @@
 import logging
-import json
+import time
 import datetime
-from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .gcs_client import get_storage_client
+from .codec import upload_encoded, extension
+from ..metrics import incr
+from .snapshot import upload_snapshot
 
 # basic logging config
 logging.basicConfig(
@@ -10,19 +14,99 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def upload_poem(poem: dict, gcs_prefix: str, bucket_name: str):
-    client = storage.Client()
+def upload_poem(poem: dict, gcs_prefix: str, bucket_name: str, client=None):
+    client = client or get_storage_client()
     slug = poem["slug"]
     date = datetime.datetime.now().strftime("%Y%m%d")
-    filename = f"{gcs_prefix}{slug}_{date}.json"
+    filename = f"{gcs_prefix}{slug}_{date}{extension()}"
 
     blob = client.bucket(bucket_name).blob(filename)
-    blob.upload_from_string(
-        json.dumps(poem, ensure_ascii=False, indent=2), content_type="application/json"
-    )
+    data = upload_encoded(blob, poem)
+    incr("gcs_objects_uploaded", kind="poem")
+    incr("gcs_bytes_uploaded", len(data), kind="poem")
     logger.info(f"Uploaded {filename} to GCS.")
 
 
-def upload_collection(poems: list[dict], gcs_prefix: str, bucket_name: str):
-    for poem in poems:
-        upload_poem(poem, gcs_prefix, bucket_name)
+def upload_collection(
+    poems: list[dict],
+    gcs_prefix: str,
+    bucket_name: str,
+    max_workers: int = 8,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+    snapshot_prefix: str | None = None,
+) -> dict[str, str]:
+    """
+    Uploads poems concurrently through one shared storage client.
+
+    Failed uploads are retried (with exponential backoff) up to `max_retries`
+    times; a failure never aborts the other uploads.
+
+    Args:
+        max_workers (int): Number of concurrent uploads. 1 uploads sequentially.
+        max_retries (int): Attempts per poem before giving up.
+        backoff (float): Base delay in seconds between retry rounds.
+        snapshot_prefix (str): If set, upload the whole collection as a single
+            snapshot under this prefix instead of one object per poem.
+
+    Returns:
+        dict: slug -> error message for every poem that still failed.
+    """
+    # every poem gets at least one try, or nothing is uploaded (nor reported)
+    max_retries = max(max_retries, 1)
+    if snapshot_prefix:
+        return _upload_collection_snapshot(
+            poems, snapshot_prefix, bucket_name, max_retries, backoff
+        )
+
+    client = get_storage_client()
+    pending = {poem["slug"]: poem for poem in poems}
+    failures = {}
+
+    for attempt in range(1, max_retries + 1):
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(upload_poem, poem, gcs_prefix, bucket_name, client): slug
+                for slug, poem in pending.items()
+            }
+            for future in as_completed(futures):
+                slug = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[slug] = str(e)
+                    logger.warning(f"⚠️ Upload of '{slug}' failed (try {attempt}): {e}")
+
+        if not failures:
+            break
+        pending = {slug: pending[slug] for slug in failures}
+        if attempt < max_retries:
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+    if failures:
+        logger.error(f"❌ {len(failures)} poem(s) failed to upload: {list(failures)}")
+    else:
+        logger.info(f"Uploaded {len(poems)} poem(s) to GCS.")
+    return failures
+
+
+def _upload_collection_snapshot(
+    poems: list[dict],
+    snapshot_prefix: str,
+    bucket_name: str,
+    max_retries: int,
+    backoff: float,
+) -> dict[str, str]:
+    for attempt in range(1, max_retries + 1):
+        try:
+            upload_snapshot(poems, snapshot_prefix, bucket_name)
+            return {}
+        except Exception as e:
+            error = str(e)
+            logger.warning(f"⚠️ Snapshot upload failed (try {attempt}): {e}")
+            if attempt < max_retries:
+                time.sleep(backoff * 2 ** (attempt - 1))
+
+    logger.error(f"❌ Snapshot of {len(poems)} poem(s) failed to upload.")
+    return {poem["slug"]: error for poem in poems}
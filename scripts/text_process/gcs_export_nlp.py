@@ -1,7 +1,9 @@
 import logging
-import json
 import datetime
-from google.cloud import storage
+from .gcs_client import get_storage_client
+from .manifest import write_latest_manifest
+from .codec import upload_encoded, extension
+from ..metrics import incr
 
 # basic logging config
 logging.basicConfig(
@@ -12,28 +14,42 @@ logger = logging.getLogger(__name__)
 
 def upload_output(output: dict, mode: str, gcs_prefix: str, bucket_name: str):
     """
-    Uploads a dictionary as a JSON file to GCS.
+    Uploads a dictionary as a JSON file to GCS and points `{gcs_prefix}LATEST`
+    at it.
 
     Args:
         output (dict): The JSON-serializable dictionary to upload.
-        mode (str): Either 'llm' or 'emoji', used to determine storage path.
+        mode (str): 'llm', 'emoji', 'related' or 'view', used to determine
+            storage path.
+
+    Returns:
+        str: Name of the uploaded blob.
 
     Raises:
         ValueError: If mode is not one of the expected values.
     """
 
-    client = storage.Client()
+    client = get_storage_client()
     date = datetime.datetime.now().strftime("%Y%m%d")
+    ext = extension()
     if mode == "llm":
-        filename = f"{gcs_prefix}llm_output_{date}.json"
+        filename = f"{gcs_prefix}llm_output_{date}{ext}"
     elif mode == "emoji":
-        filename = f"{ gcs_prefix}emoji_output_{date}.json"
+        filename = f"{ gcs_prefix}emoji_output_{date}{ext}"
+    elif mode == "related":
+        filename = f"{gcs_prefix}related_{date}{ext}"
+    elif mode == "view":
+        filename = f"{gcs_prefix}view_model_{date}{ext}"
     else:
-        raise ValueError(f"Invalid mode '{mode}'. Expected 'llm' or 'emoji'.")
+        raise ValueError(
+            f"Invalid mode '{mode}'. Expected 'llm', 'emoji', 'related' or 'view'."
+        )
 
-    blob = client.bucket(bucket_name).blob(filename)
-    blob.upload_from_string(
-        json.dumps(output, ensure_ascii=False, indent=2),
-        content_type="application/json",
-    )
+    bucket = client.bucket(bucket_name)
+    blob = bucket.blob(filename)
+    data = upload_encoded(blob, output)
+    incr("gcs_objects_uploaded", kind=mode)
+    incr("gcs_bytes_uploaded", len(data), kind=mode)
     logger.info(f"Uploaded {filename} to GCS.")
+    write_latest_manifest(bucket, gcs_prefix, blob, data)
+    return filename
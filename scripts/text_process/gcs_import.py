@@ -1,6 +1,10 @@
 import logging
-import json
-from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
+from .gcs_client import get_storage_client
+from ..metrics import incr
+from .blob_cache import BlobCache, get_default_cache
+from .codec import decode, EXTENSIONS
+from .snapshot import load_snapshot_index, download_snapshot
 
 # basic logging config
 logging.basicConfig(
@@ -9,16 +13,78 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def download_collection(prefix: str, bucket_name: str):
-    client = storage.Client()
+def download_blob(blob, cache: BlobCache | None = None) -> bytes:
+    """Downloads a listed blob, reading it from the local cache when unchanged."""
+    version = blob.generation or blob.etag
+    if cache is not None and version:
+        data = cache.get(blob.name, version)
+        if data is not None:
+            incr("gcs_cache_hits", kind="poem")
+            return data
 
-    bucket = client.bucket(bucket_name)
-    blobs = bucket.list_blobs(prefix=prefix)
-    poems = []
+    # raw: gzip stays compressed on the wire (decode inflates it), so the byte
+    # count below is the transfer, not the decoded size
+    data = blob.download_as_bytes(raw_download=True)
+    incr("gcs_objects_downloaded", kind="poem")
+    incr("gcs_bytes_downloaded", len(data), kind="poem")
+    if cache is not None and version:
+        cache.put(blob.name, version, data)
+    return data
+
+
+def latest_poem_blobs(blobs, prefix: str) -> list:
+    """Keeps only the most recent `{slug}_{YYYYMMDD}.<ext>` object per slug."""
+    latest = {}
     for blob in blobs:
-        content = blob.download_as_text()
-        text = json.loads(content)
-        poems.append(text)
+        if not blob.name.endswith(EXTENSIONS):
+            continue
+        slug = blob.name[len(prefix) :].rsplit("_", 1)[0]
+        # same day in both formats: the name sorts .msgpack after .json
+        if slug not in latest or blob.name > latest[slug].name:
+            latest[slug] = blob
+    return sorted(latest.values(), key=lambda b: b.name)
+
+
+def download_collection(
+    prefix: str,
+    bucket_name: str,
+    max_workers: int = 8,
+    use_cache: bool = True,
+    snapshot_prefix: str | None = None,
+):
+    """
+    Downloads the current poem collection.
+
+    Reads the bundled snapshot under `snapshot_prefix` when one exists, and
+    otherwise falls back to the per-poem layout under `prefix`, downloading the
+    latest copy of each poem concurrently.
+
+    Args:
+        max_workers (int): Number of concurrent downloads.
+        use_cache (bool): Serve unchanged objects from the local blob cache.
+        snapshot_prefix (str): Where snapshots are stored, if any.
+    """
+    client = get_storage_client()
+    cache = get_default_cache() if use_cache else None
+
+    if snapshot_prefix:
+        index = load_snapshot_index(snapshot_prefix, bucket_name)
+        if index:
+            poems = download_snapshot(index, bucket_name, cache)
+            logger.info(f"Downloaded {len(poems)} poem(s) from {index['snapshot']}.")
+            return poems
+        logger.info("No snapshot found, falling back to per-poem objects.")
+
+    hits_before = cache.hits if cache is not None else 0
+    blobs = latest_poem_blobs(
+        client.bucket(bucket_name).list_blobs(prefix=prefix), prefix
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        contents = pool.map(lambda blob: download_blob(blob, cache), blobs)
+        poems = [decode(content) for content in contents]
 
+    if cache is not None:
+        hits = cache.hits - hits_before
+        logger.info(f"Blob cache: {hits}/{len(blobs)} poem(s) read from disk.")
     logger.info(f"Downloaded {len(poems)} poem(s) from GCS.")
     return poems
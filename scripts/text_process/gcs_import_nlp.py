@@ -1,12 +1,22 @@
-import json
-from google.cloud import storage
+from .gcs_client import get_storage_client
+from .manifest import LATEST_NAME, read_latest_manifest
+from .codec import decode
+from ..metrics import incr
 
 
 def fetch_latest_blob_from_gcs(bucket_name: str, prefix: str) -> str:
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
+    bucket = get_storage_client().bucket(bucket_name)
 
-    blobs = list(bucket.list_blobs(prefix=prefix))
+    # one GET on the pointer; only list the prefix for outputs without one
+    manifest = read_latest_manifest(bucket, prefix)
+    if manifest:
+        return manifest["blob"]
+
+    blobs = [
+        blob
+        for blob in bucket.list_blobs(prefix=prefix)
+        if not blob.name.endswith(LATEST_NAME)
+    ]
     if not blobs:
         raise FileNotFoundError(f"No files found in GCS path with prefix: {prefix}")
 
@@ -15,7 +25,17 @@ def fetch_latest_blob_from_gcs(bucket_name: str, prefix: str) -> str:
 
 
 def load_json_from_gcs(bucket_name, blob_path):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
+    bucket = get_storage_client().bucket(bucket_name)
     blob = bucket.blob(blob_path)
-    return json.loads(blob.download_as_text())
+    # raw: gzip stays compressed on the wire (decode inflates it), so the byte
+    # count below is the transfer, not the decoded size
+    data = blob.download_as_bytes(raw_download=True)
+    incr("gcs_objects_downloaded", kind="output")
+    incr("gcs_bytes_downloaded", len(data), kind="output")
+    return decode(data)
+
+
+def fetch_generation(bucket_name: str, blob_path: str) -> int | None:
+    """Current generation of an object (one metadata GET), None if missing."""
+    blob = get_storage_client().bucket(bucket_name).get_blob(blob_path)
+    return blob.generation if blob is not None else None
@@ -1,10 +1,12 @@
+import json
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
-import unicodedata
-from langdetect import detect
-from langdetect.lang_detect_exception import LangDetectException
-import re
+from .enrich import enrich_poems, slugify
+from ..metrics import span, incr
 
 # basic logging config
 logging.basicConfig(
@@ -18,29 +20,109 @@ class GDocsImporter:
         self.creds_path = creds_path
         self.scopes = scopes
         self.doc_id = doc_id
+        self._local = threading.local()
         self.service = self._auth()
 
     def _auth(self):
         """Authenticate and return Google Docs API service."""
         flow = InstalledAppFlow.from_client_secrets_file(self.creds_path, self.scopes)
-        creds = flow.run_local_server(port=0)
-        return build("docs", "v1", credentials=creds)
+        self.creds = flow.run_local_server(port=0)
+        return build("docs", "v1", credentials=self.creds)
+
+    def _thread_service(self):
+        """API clients aren't thread-safe, so each worker thread builds its own."""
+        if not hasattr(self._local, "service"):
+            self._local.service = build(
+                "docs", "v1", credentials=self.creds, cache_discovery=False
+            )
+        return self._local.service
 
     def _normalize_title(self, title: str) -> str:
-        title_str = (
-            unicodedata.normalize("NFKD", title)
-            .encode("ascii", "ignore")
-            .decode("utf-8")
-        )
-        title_str = title_str.lower().strip()
-        title_str = title_str.replace("°", "no").replace(" ", "_")
-        return title_str
+        return slugify(title)
 
-    def fetch_google_doc(self, doc_id: str):
+    def fetch_google_doc(self, doc_id: str, service=None):
         """Download the Google Doc content."""
-        return self.service.documents().get(documentId=doc_id).execute()
+        service = service or self.service
+        incr("gdocs_requests", kind="document")
+        return service.documents().get(documentId=doc_id).execute()
+
+    def fetch_revision_id(self, doc_id: str, service=None) -> str:
+        """Fetch only the document's current revisionId (a tiny response)."""
+        service = service or self.service
+        incr("gdocs_requests", kind="revision")
+        document = (
+            service.documents().get(documentId=doc_id, fields="revisionId").execute()
+        )
+        return document["revisionId"]
+
+    @staticmethod
+    def section_hash(poem: dict) -> str:
+        key = json.dumps(
+            [poem.get("title"), poem.get("date"), poem.get("body")], ensure_ascii=False
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def import_document(self, doc_id: str, previous: dict | None):
+        """
+        Import one document incrementally against its `previous` state.
+
+        Returns:
+            tuple: (changed raw sections, doc state {"revision_id", "poems":
+            slug -> hash}). Nothing is downloaded when the revision is unchanged.
+        """
+        service = self._thread_service()
+        revision_id = self.fetch_revision_id(doc_id, service)
+        if previous and previous.get("revision_id") == revision_id:
+            logger.info(f"⏭️ {doc_id} unchanged (revision {revision_id}).")
+            return [], previous
+
+        # hash the raw sections, so only changed poems go through enrichment
+        with span("gdocs_fetch", doc_id=doc_id):
+            document = self.fetch_google_doc(doc_id, service)
+        with span("parse", doc_id=doc_id):
+            sections = self.parse_google_doc(document, enrich=False)
+        hashes = {slugify(raw["title"]): self.section_hash(raw) for raw in sections}
+        previous_hashes = (previous or {}).get("poems", {})
+        changed = [
+            raw
+            for raw in sections
+            if previous_hashes.get(slugify(raw["title"])) != self.section_hash(raw)
+        ]
+        logger.info(f"{doc_id}: {len(changed)} of {len(sections)} poem(s) changed.")
+        return changed, {"revision_id": revision_id, "poems": hashes}
+
+    def import_documents(self, doc_ids: list[str], state: dict, max_workers: int = 4):
+        """
+        Import several documents concurrently.
+
+        Args:
+            state (dict): doc_id -> state returned by the previous import.
+
+        Returns:
+            tuple: (changed poems, enriched; ordered slugs of the full current
+            collection; new state).
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(
+                    lambda doc_id: self.import_document(doc_id, state.get(doc_id)),
+                    doc_ids,
+                )
+            )
+
+        with span("enrich"):
+            changed = enrich_poems([raw for sections, _ in results for raw in sections])
+        slugs = [slug for _, doc_state in results for slug in doc_state["poems"]]
+        new_state = {
+            doc_id: doc_state for doc_id, (_, doc_state) in zip(doc_ids, results)
+        }
+        return changed, slugs, new_state
 
-    def parse_google_doc(self, document: dict) -> list[dict]:
+    def parse_google_doc(self, document: dict, enrich: bool = True) -> list[dict]:
+        """
+        Split the document into poems. With `enrich=False` the raw sections
+        ({"title", "date", "body"}) are returned without slug/language.
+        """
         content = document.get("body", {}).get("content", [])
         poems = []
         current_poem = {}
@@ -64,19 +146,10 @@ class GDocsImporter:
             if style == "HEADING_4":
                 # Finalize previous poem
                 if current_poem and body_lines:
-                    raw_body = " ".join(body_lines)
-                    clean_body = re.sub(r"[\s\x0b]+", " ", raw_body).strip()
-                    current_poem["body"] = clean_body
-                    try:
-                        current_poem["language"] = detect(clean_body)
-                    except LangDetectException:
-                        current_poem["language"] = "unknown"
+                    current_poem["body"] = " ".join(body_lines)
                     poems.append(current_poem)
                     body_lines = []
-                current_poem = {
-                    "title": full_line,
-                    "slug": self._normalize_title(full_line),
-                }
+                current_poem = {"title": full_line}
                 expecting_date = True
                 collecting_body = False
                 continue
@@ -96,16 +169,13 @@ class GDocsImporter:
                 body_lines.append(full_line.strip())
         # Final poem
         if current_poem and body_lines:
-            raw_body = " ".join(body_lines)
-            clean_body = re.sub(r"[\s\x0b]+", " ", raw_body).strip()
-            current_poem["body"] = clean_body
-            try:
-                current_poem["language"] = detect(clean_body)
-            except LangDetectException:
-                current_poem["language"] = "unknown"
+            current_poem["body"] = " ".join(body_lines)
             poems.append(current_poem)
 
+        if enrich:
+            poems = enrich_poems(poems)
         logger.info(f"{len(poems)} poems parsed.")
-        logger.info(f"{poems[0]} poems parsed.")
+        if poems:
+            logger.info(f"{poems[0]} poems parsed.")
 
         return poems
@@ -0,0 +1,81 @@
+import logging
+import json
+import hashlib
+import datetime
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+LATEST_NAME = "LATEST"
+
+
+def write_latest_manifest(bucket, prefix: str, blob, data: bytes, max_attempts=5):
+    """
+    Points `{prefix}LATEST` at `blob`, unless it already points at newer data.
+
+    Each attempt reads the current manifest first: if its data was uploaded
+    after ours, we give up and keep it, so an older upload never replaces a
+    newer one. Otherwise the pointer is swapped with a generation precondition
+    (compare-and-swap) on the manifest just read, and the check is repeated
+    when a concurrent writer swaps it first.
+
+    Returns:
+        dict: the manifest `{prefix}LATEST` now holds (ours or the newer one).
+    """
+    uploaded = blob.updated or datetime.datetime.now(datetime.timezone.utc)
+    manifest = {
+        "blob": blob.name,
+        "generation": blob.generation,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "updated": uploaded.isoformat(),
+    }
+    payload = json.dumps(manifest)
+    name = f"{prefix}{LATEST_NAME}"
+
+    for _ in range(max_attempts):
+        current = bucket.get_blob(name)
+        generation = 0
+        if current is not None:
+            try:
+                # the generation pins the read to the manifest the swap expects
+                competing = json.loads(current.download_as_bytes())
+            except NotFound:
+                logger.info(f"{name} changed concurrently, retrying.")
+                continue
+            if _uploaded(competing) > uploaded:
+                logger.info(
+                    f"{name} already points at newer {competing.get('blob')}, "
+                    f"leaving it."
+                )
+                return competing
+            generation = current.generation
+        try:
+            bucket.blob(name).upload_from_string(
+                payload,
+                content_type="application/json",
+                if_generation_match=generation,
+            )
+            logger.info(f"Pointed {name} at {blob.name}.")
+            return manifest
+        except PreconditionFailed:
+            logger.info(f"{name} changed concurrently, retrying.")
+    raise RuntimeError(f"Could not update {name} after {max_attempts} attempts.")
+
+
+def _uploaded(manifest: dict) -> datetime.datetime:
+    try:
+        return datetime.datetime.fromisoformat(manifest["updated"])
+    except (KeyError, TypeError, ValueError):
+        return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+def read_latest_manifest(bucket, prefix: str) -> dict | None:
+    """Returns the `{prefix}LATEST` manifest, or None when it doesn't exist."""
+    try:
+        return json.loads(bucket.blob(f"{prefix}{LATEST_NAME}").download_as_bytes())
+    except NotFound:
+        return None
@@ -0,0 +1,33 @@
+import os
+import logging
+from dotenv import load_dotenv
+from .gcs_import import download_collection
+from .snapshot import upload_snapshot
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def migrate_to_snapshot(prefix: str, snapshot_prefix: str, bucket_name: str) -> str:
+    """
+    Bundles the latest copy of every per-poem object under `prefix` into a
+    snapshot. The per-poem objects are left in place.
+    """
+    poems = download_collection(prefix, bucket_name)
+    if not poems:
+        raise FileNotFoundError(f"No poems found in GCS path with prefix: {prefix}")
+    return upload_snapshot(poems, snapshot_prefix, bucket_name)
+
+
+# python -m scripts.text_process.migrate_snapshot
+if __name__ == "__main__":
+    load_dotenv()
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv(
+        "GOOGLE_CLOUD_CREDS_PATH", "secrets/service_account.json"
+    )
+    migrate_to_snapshot(
+        "data/poems/", "data/snapshots/poems/", os.environ["GCS_BUCKET"]
+    )
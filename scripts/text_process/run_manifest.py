@@ -0,0 +1,70 @@
+import logging
+import json
+import hashlib
+import datetime
+from google.api_core.exceptions import NotFound
+from .gcs_client import get_storage_client
+from .codec import upload_encoded, decode
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+RUN_MANIFEST_PATH = "data/manifests/run_manifest.json"
+
+
+def poem_fingerprint(poem: dict) -> str:
+    """Content hash of everything downstream stages read from a poem."""
+    key = json.dumps(
+        [poem.get("title"), poem.get("body"), poem.get("language")],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def export_fingerprint(poem: dict) -> str:
+    """Content hash of every field exported to GCS (date included)."""
+    key = json.dumps(poem, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def fingerprint_collection(
+    poems: list[dict], fingerprint=poem_fingerprint
+) -> dict[str, str]:
+    return {poem["slug"]: fingerprint(poem) for poem in poems}
+
+
+def collection_fingerprint(fingerprints: dict[str, str]) -> str:
+    key = json.dumps(sorted(fingerprints.items()))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def stale_poems(poems, fingerprints, stage_state: dict, version: str) -> list[dict]:
+    """
+    Poems a stage has to (re)process: all of them when the stage version (model,
+    prompt, layout...) changed, otherwise those whose fingerprint changed.
+    """
+    if stage_state.get("version") != version:
+        return list(poems)
+    done = stage_state.get("poems", {})
+    return [
+        poem for poem in poems if done.get(poem["slug"]) != fingerprints[poem["slug"]]
+    ]
+
+
+def load_run_manifest(bucket_name: str) -> dict:
+    blob = get_storage_client().bucket(bucket_name).blob(RUN_MANIFEST_PATH)
+    try:
+        return decode(blob.download_as_bytes())
+    except NotFound:
+        logger.info("No run manifest found, processing everything.")
+        return {}
+
+
+def save_run_manifest(manifest: dict, bucket_name: str):
+    manifest["updated"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    blob = get_storage_client().bucket(bucket_name).blob(RUN_MANIFEST_PATH)
+    upload_encoded(blob, manifest, "json+gzip")
+    logger.info(f"Saved run manifest to {RUN_MANIFEST_PATH}.")
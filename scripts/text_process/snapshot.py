@@ -0,0 +1,112 @@
+import logging
+import json
+import gzip
+import datetime
+from google.api_core.exceptions import NotFound
+from .gcs_client import get_storage_client
+from .blob_cache import BlobCache
+from .codec import upload_encoded, decode
+from ..metrics import incr
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+
+
+# Snapshot layout: one gzip member per poem (one JSON line each), concatenated.
+# The whole file is a valid multi-member gzip stream, and each member can be
+# fetched and decompressed on its own via a range read.
+def build_snapshot(poems: list[dict]) -> tuple[bytes, dict]:
+    chunks = []
+    offsets = {}
+    offset = 0
+    for poem in poems:
+        line = json.dumps(poem, ensure_ascii=False) + "\n"
+        member = gzip.compress(line.encode("utf-8"), mtime=0)
+        offsets[poem["slug"]] = [offset, len(member)]
+        chunks.append(member)
+        offset += len(member)
+    return b"".join(chunks), offsets
+
+
+def parse_snapshot(data: bytes) -> list[dict]:
+    lines = gzip.decompress(data).decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines if line]
+
+
+def upload_snapshot(poems: list[dict], snapshot_prefix: str, bucket_name: str):
+    """
+    Uploads the collection as one snapshot object, then swaps the index.
+
+    The index (slug -> [offset, length]) is written last, so readers always see
+    either the previous or the new snapshot, never a partial one.
+
+    Returns:
+        str: Name of the uploaded snapshot blob.
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    date = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    filename = f"{snapshot_prefix}collection_{date}.ndjson.gz"
+
+    data, offsets = build_snapshot(poems)
+    # no content-encoding: GCS would otherwise transcode and ignore range reads
+    blob = bucket.blob(filename)
+    blob.upload_from_string(data, content_type="application/gzip")
+    incr("gcs_objects_uploaded", kind="snapshot")
+    incr("gcs_bytes_uploaded", len(data), kind="snapshot")
+
+    index = {
+        "snapshot": filename,
+        "generation": blob.generation,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "count": len(poems),
+        "poems": offsets,
+    }
+    # the index name is fixed, so it stays JSON whatever the configured codec
+    upload_encoded(bucket.blob(f"{snapshot_prefix}{INDEX_NAME}"), index, "json+gzip")
+    logger.info(f"Uploaded snapshot {filename} ({len(poems)} poems) to GCS.")
+    return filename
+
+
+def load_snapshot_index(snapshot_prefix: str, bucket_name: str) -> dict | None:
+    """Returns the current snapshot index, or None when no snapshot exists yet."""
+    blob = (
+        get_storage_client().bucket(bucket_name).blob(f"{snapshot_prefix}{INDEX_NAME}")
+    )
+    try:
+        return decode(blob.download_as_bytes())
+    except NotFound:
+        return None
+
+
+def download_snapshot(index: dict, bucket_name: str, cache: BlobCache | None = None):
+    """Downloads the whole collection referenced by `index` in a single GET."""
+    name = index["snapshot"]
+    version = index.get("generation")
+    data = cache.get(name, version) if cache is not None and version else None
+    if data is not None:
+        incr("gcs_cache_hits", kind="snapshot")
+    else:
+        blob = get_storage_client().bucket(bucket_name).blob(name)
+        data = blob.download_as_bytes()
+        incr("gcs_objects_downloaded", kind="snapshot")
+        incr("gcs_bytes_downloaded", len(data), kind="snapshot")
+        if cache is not None and version:
+            cache.put(name, version, data)
+    return parse_snapshot(data)
+
+
+def load_poem(slug: str, snapshot_prefix: str, bucket_name: str) -> dict | None:
+    """Fetches a single poem from the current snapshot with a range read."""
+    index = load_snapshot_index(snapshot_prefix, bucket_name)
+    if not index or slug not in index["poems"]:
+        return None
+
+    offset, length = index["poems"][slug]
+    blob = get_storage_client().bucket(bucket_name).blob(index["snapshot"])
+    member = blob.download_as_bytes(start=offset, end=offset + length - 1)
+    return json.loads(gzip.decompress(member))
@@ -0,0 +1,79 @@
+import time
+import logging
+import threading
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Serves the last loaded value immediately and refreshes it in the background.
+
+    Every `interval` seconds a daemon thread calls the cheap `version_fn`
+    (e.g. object generations); only when the version changed does it call the
+    expensive `loader` and swap the new value in. Readers never wait on a
+    refresh, and a failed refresh keeps serving the current value.
+
+    A cache `seed`ed with a value (e.g. a snapshot baked into the image) never
+    loads in the foreground: its refresh thread starts right away and runs
+    the first check after `refresh_after` seconds instead of `interval`.
+    """
+
+    def __init__(self, loader, version_fn, interval: float):
+        self.loader = loader
+        self.version_fn = version_fn
+        self.interval = interval
+        self._value = None
+        self._version = None
+        self._loaded = False
+        self._first_delay = interval
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="swr-refresh", daemon=True
+        )
+
+    def seed(self, value, version, refresh_after: float = 0.0):
+        """Serves `value`, loaded at `version`, until a refresh replaces it."""
+        with self._lock:
+            if not self._loaded:
+                self._value, self._version, self._loaded = value, version, True
+                self._first_delay = refresh_after
+        self.start()
+
+    def start(self):
+        """Starts the background refresh, if it isn't running yet."""
+        if not self._thread.is_alive():
+            with self._lock:
+                if self._thread.ident is None:
+                    self._thread.start()
+
+    def get(self):
+        # only the very first read of an unseeded process waits for a load
+        with self._lock:
+            if not self._loaded:
+                self._refresh(force=True)
+        self.start()
+        return self._value
+
+    def _refresh(self, force: bool = False) -> bool:
+        version = self.version_fn()
+        if not force and version == self._version:
+            return False
+        value = self.loader()
+        self._value, self._version, self._loaded = value, version, True
+        return True
+
+    def _run(self):
+        delay = self._first_delay
+        while True:
+            time.sleep(delay)
+            delay = self.interval
+            try:
+                if self._refresh():
+                    logger.info(f"🔄 Swapped in refreshed data ({self._version}).")
+            except Exception as e:
+                logger.warning(f"⚠️ Background refresh failed, serving cached: {e}")
@@ -0,0 +1,130 @@
+import re
+
+# emoji for the category names the grouping prompt used to return; clustered
+# themes (LLM_THEME_MODE=cluster) come with their own
+THEME_EMOJIS = {
+    "Existential Conundrums": "🌀",
+    "Work-Life Balance and Professional Challenges": "💼",
+    "Coping with Reality": "🧠",
+    "Life and Death": "🪦",
+}
+
+LOW_CONFIDENCE_EMOJIS = {
+    "document_egare_n2",
+}
+
+MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+
+def extract_markdown_categories(raw):
+    pattern = r"\*\*Category \d+: (.*?)\*\*\n(.*?)(?=\n\*\*Category \d+:|$)"
+    matches = re.findall(pattern, raw, re.DOTALL)
+    return [{"title": m[0].strip(), "description": m[1].strip()} for m in matches]
+
+
+def extract_favorites(raw):
+    lines = [line.strip() for line in raw.split("\n") if line.strip()]
+    favorites = []
+    for i, line in enumerate(lines[:3]):
+        match = re.match(r"\d+\.\s*(.+?):\s*(.+)", line)
+        if match:
+            title, desc = match.groups()
+            favorites.append({"rank": i + 1, "title": title, "description": desc})
+    return favorites
+
+
+# Theme cards, two per row, as one HTML block
+def render_categories(categories):
+    cards = "".join(
+        f"<div class='card-box'><h4>{c['emoji']} {c['title']}</h4>"
+        f"<p>{c['description']}</p></div>"
+        for c in categories
+    )
+    return (
+        "<div style='display: grid; grid-template-columns: 1fr 1fr; "
+        f"column-gap: 1rem;'>{cards}</div>"
+    )
+
+
+def render_favorites(favorites):
+    return "\n\n".join(
+        f"{MEDALS[f['rank']]} **{f['title']}**  \n{f['description']}" for f in favorites
+    )
+
+
+def render_emoji_rows(rows):
+    return "\n".join(
+        (
+            f"- **{row['title']}** — {row['emoji']} ⚠️ _low confidence_"
+            if row["low_confidence"]
+            else f"- **{row['title']}** — {row['emoji']}"
+        )
+        for row in rows
+    )
+
+
+def render_related(neighbors, titles):
+    return "\n".join(
+        f"- **{titles[n['slug']]}** — {n['score']:.0%} similar"
+        for n in neighbors
+        if n["slug"] in titles
+    )
+
+
+def build_view_model(
+    poems, llm_output, emoji_output, llm_path, related_output=None
+) -> dict:
+    """
+    Everything the app shows, parsed and pre-rendered once by the pipeline so
+    Streamlit reruns only emit a few precomputed markdown blocks.
+    """
+    llm_output = llm_output or {}
+    if llm_output.get("themes"):
+        categories = [
+            {
+                "title": theme["title"],
+                "description": theme["description"],
+                "emoji": theme.get("emoji") or "🧩",
+                "slugs": theme.get("slugs", []),
+            }
+            for theme in llm_output["themes"]
+        ]
+    else:
+        categories = [
+            {**theme, "emoji": THEME_EMOJIS.get(theme["title"], "🧩")}
+            for theme in extract_markdown_categories(llm_output.get("categories", ""))
+        ]
+    favorites = extract_favorites(llm_output.get("favorites", ""))
+    emoji_rows = [
+        {
+            "slug": poem["slug"],
+            "title": poem["title"],
+            "emoji": emoji_output.get(poem["slug"], {}).get("emoji", "❓"),
+            "low_confidence": poem["slug"] in LOW_CONFIDENCE_EMOJIS,
+        }
+        for poem in poems
+        # English poems always had a model; other languages once scored
+        if poem.get("language") == "en" or poem["slug"] in emoji_output
+    ]
+    titles = {poem["slug"]: poem["title"] for poem in poems}
+    related = {
+        slug: neighbors
+        for slug, neighbors in (related_output or {}).items()
+        if slug in titles
+    }
+
+    return {
+        "llm_path": llm_path,
+        "categories": categories,
+        "categories_html": render_categories(categories) if categories else "",
+        "favorites": favorites,
+        "favorites_markdown": render_favorites(favorites),
+        "emoji_rows": emoji_rows,
+        "emoji_markdown": render_emoji_rows(emoji_rows),
+        "title_lookup": {poem["title"]: poem["slug"] for poem in poems},
+        "related": related,
+        "related_markdown": {
+            slug: render_related(neighbors, titles)
+            for slug, neighbors in related.items()
+        },
+    }
@@ -0,0 +1,73 @@
+import sys
+import time
+import logging
+from .emoji_classifier_en import (
+    get_model_pool,
+    get_emotion_classifier,
+    generate_score_batched,
+    validate_backend,
+)
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SAMPLE_BODIES = [
+    "The train is late again and the platform smells of rain and cigarettes.",
+    "I filled in the form twice, and twice they asked for another proof of address.",
+    "Sunday market, warm bread, and for a moment I forgot I was a foreigner here.",
+    "My manager said the deadline was flexible, then called at nine on a Saturday.",
+    "We buried the old cat under the lemon tree and nobody spoke for an hour.",
+]
+
+
+def sample_poems(n: int) -> list[dict]:
+    return [
+        {
+            "title": f"Sample {i}",
+            "slug": f"sample_{i}",
+            "language": "en",
+            "body": " ".join(SAMPLE_BODIES[i % len(SAMPLE_BODIES) :] * (1 + i % 3)),
+        }
+        for i in range(n)
+    ]
+
+
+def benchmark_backend(backend: str, poems: list[dict]) -> dict:
+    get_model_pool().clear()
+    start = time.perf_counter()
+    get_emotion_classifier(backend)
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_score_batched(poems, backend=backend)
+    elapsed = time.perf_counter() - start
+
+    max_diff = validate_backend(poems, backend) if backend != "fp32" else 0.0
+    return {
+        "backend": backend,
+        "startup_s": round(startup, 2),
+        "poems_per_s": round(len(poems) / elapsed, 1),
+        "max_diff_vs_fp32": round(max_diff, 4),
+    }
+
+
+# python -m scripts.transformers.benchmark_emoji_backends [n_poems] [backends...]
+if __name__ == "__main__":
+    n_poems = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    backends = sys.argv[2:] or ["fp32", "int8", "onnx"]
+    poems = sample_poems(n_poems)
+
+    for backend in backends:
+        try:
+            result = benchmark_backend(backend, poems)
+        except (ImportError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping {backend}: {e}")
+            continue
+        logger.info(
+            f"{result['backend']:>5} | startup {result['startup_s']:>6}s | "
+            f"{result['poems_per_s']:>7} poems/s | "
+            f"max diff vs fp32 {result['max_diff_vs_fp32']}"
+        )
@@ -0,0 +1,181 @@
+import os
+import json
+import logging
+import tempfile
+import functools
+import threading
+import numpy as np
+from ..text_process.enrich import body_hash
+from ..metrics import span, incr
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# multilingual, the collection mixes French and English
+EMBEDDING_MODEL = os.getenv(
+    "EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "5"))
+# rows of the similarity matrix computed at once: memory is block x n floats
+SIMILARITY_BLOCK_ROWS = 1024
+# the related and cluster-theme branches embed concurrently: one at a time,
+# so the second reuses the first's rows and never interleaves its writes
+_store_lock = threading.Lock()
+
+
+def embedding_version(model_name=EMBEDDING_MODEL, top_k=RELATED_TOP_K) -> str:
+    """Identifies the neighbors a run produces, for incremental reruns."""
+    return f"{model_name}:top{top_k}"
+
+
+# Load the sentence-transformers model on first use
+@functools.lru_cache(maxsize=None)
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def store_paths(model_name=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR):
+    """(vectors.npy, index.json) of the model's embedding store."""
+    directory = os.path.join(cache_dir, model_name.replace("/", "__"))
+    return os.path.join(directory, "vectors.npy"), os.path.join(directory, "index.json")
+
+
+def load_embeddings(model_name=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    The last stored embeddings: (index {"slugs", "hashes"}, memory-mapped
+    float32 matrix with one unit row per slug), or (None, None).
+    """
+    vectors_path, index_path = store_paths(model_name, cache_dir)
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"⚠️ Ignoring unreadable embedding store: {e}")
+        return None, None
+    if len(index["slugs"]) != len(vectors):
+        logger.warning("⚠️ Embedding store index and vectors disagree, ignoring.")
+        return None, None
+    return index, vectors
+
+
+def save_embeddings(index: dict, vectors: np.ndarray, model_name, cache_dir):
+    vectors_path, index_path = store_paths(model_name, cache_dir)
+    os.makedirs(os.path.dirname(vectors_path), exist_ok=True)
+    # vectors first, the index last: a crash in between fails the length check
+    directory = os.path.dirname(vectors_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npy.tmp")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, vectors.astype(np.float32, copy=False))
+    os.replace(tmp_path, vectors_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def embed_poems(
+    poems,
+    model_name=EMBEDDING_MODEL,
+    batch_size=EMBEDDING_BATCH_SIZE,
+    cache_dir=EMBEDDING_CACHE_DIR,
+):
+    """
+    Embeds each poem body once: rows of the previous store are reused by body
+    hash, only new or edited bodies go through the model.
+
+    Returns:
+        tuple: (slugs, memory-mapped float32 matrix of unit rows, same order).
+    """
+    if not poems:
+        return [], np.empty((0, 0), dtype=np.float32)
+    with _store_lock:
+        return _embed_poems(poems, model_name, batch_size, cache_dir)
+
+
+def _embed_poems(poems, model_name, batch_size, cache_dir):
+    slugs = [poem["slug"] for poem in poems]
+    hashes = [body_hash(poem.get("body", "")) for poem in poems]
+
+    index, previous = load_embeddings(model_name, cache_dir)
+    previous_rows = (
+        {h: i for i, h in enumerate(index["hashes"])} if index is not None else {}
+    )
+    missing = list(dict.fromkeys(h for h in hashes if h not in previous_rows))
+    bodies = {h: poem.get("body", "") for h, poem in zip(hashes, poems)}
+    incr("embedding_cache_hits", len(set(hashes)) - len(missing))
+    logger.info(
+        f"🧭 Embedding {len(missing)} poem(s), reusing {len(poems) - len(missing)}."
+    )
+
+    new_rows = {}
+    if missing:
+        with span("embedding_inference", model=model_name):
+            encoded = get_embedding_model(model_name).encode(
+                [bodies[h] for h in missing],
+                batch_size=batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+        encoded = np.asarray(encoded, dtype=np.float32)
+        new_rows = dict(zip(missing, encoded))
+
+    dim = previous.shape[1] if previous is not None else encoded.shape[1]
+    vectors = np.empty((len(poems), dim), dtype=np.float32)
+    for row, h in enumerate(hashes):
+        vectors[row] = new_rows[h] if h in new_rows else previous[previous_rows[h]]
+
+    save_embeddings({"slugs": slugs, "hashes": hashes}, vectors, model_name, cache_dir)
+    return slugs, load_embeddings(model_name, cache_dir)[1]
+
+
+def top_k_neighbors(vectors, k=RELATED_TOP_K, block_rows=SIMILARITY_BLOCK_ROWS):
+    """
+    Each row's `k` most similar other rows by cosine similarity (rows are unit
+    vectors, so a dot product), computed a block of rows at a time.
+
+    Returns:
+        tuple: (indices, scores), both (n, k), most similar first.
+    """
+    n = len(vectors)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        similarities = vectors[start : start + block_rows] @ vectors.T
+        rows = np.arange(len(similarities))
+        similarities[rows, rows + start] = -np.inf  # a poem isn't its own neighbor
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start : start + len(rows)] = np.take_along_axis(top, order, axis=1)
+        scores[start : start + len(rows)] = np.take_along_axis(
+            top_scores, order, axis=1
+        )
+    return indices, scores
+
+
+def run_related_analysis(poems, top_k=RELATED_TOP_K, model_name=EMBEDDING_MODEL):
+    """Precomputed neighbor table: slug -> [{"slug", "score"}], best first."""
+    slugs, vectors = embed_poems(poems, model_name)
+    with span("related_neighbors"):
+        indices, scores = top_k_neighbors(vectors, top_k)
+    return {
+        slug: [
+            {"slug": slugs[j], "score": round(float(score), 4)}
+            for j, score in zip(indices[i], scores[i])
+        ]
+        for i, slug in enumerate(slugs)
+    }
@@ -1,6 +1,28 @@
 import os
-from transformers import pipeline
+import time
+import logging
+import functools
 from collections import defaultdict
+from ..metrics import span, observe
+from .model_pool import ModelPool
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "joeddav/distilbert-base-uncased-go-emotions-student"
+FRENCH_MODEL_NAME = "MilaNLProc/xlm-emo-t"
+
+# detected poem language -> emotion model, e.g. EMOJI_MODELS="en=...,fr=..."
+EMOJI_MODELS = {"en": MODEL_NAME, "fr": FRENCH_MODEL_NAME}
+if os.getenv("EMOJI_MODELS"):
+    EMOJI_MODELS = dict(
+        pair.strip().split("=", 1) for pair in os.getenv("EMOJI_MODELS").split(",")
+    )
+# total size of the models kept loaded at once, least recently used evicted first
+EMOJI_MODEL_MEMORY_MB = float(os.getenv("EMOJI_MODEL_MEMORY_MB", "1536"))
 
 EMOJI_MAP = {
     "remorse": "😔",  # quiet regret
@@ -16,17 +38,75 @@ EMOJI_MAP = {
     "confusion": "🤔",  # fog, uncertainty
     "caring": "🤗",  # soft empathy
     "embarrassment": "😳",  # vulnerability
+    # also the whole label set of the French model
+    "fear": "😨",  # dread, worry
+    "joy": "😊",  # lightness, relief
+    "sadness": "😢",  # low, heavy heart
 }
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-# Load the emotion classification pipeline
-emotion_classifier = pipeline(
-    "text-classification",
-    model="joeddav/distilbert-base-uncased-go-emotions-student",
-    return_all_scores=True,
-    top_k=None,
-)
+# batched inference: poems per batch and optional padded-token budget per batch
+EMOJI_BATCH_SIZE = int(os.getenv("EMOJI_BATCH_SIZE", "16"))
+EMOJI_MAX_BATCH_TOKENS = int(os.getenv("EMOJI_MAX_BATCH_TOKENS", "0")) or None
+# "fp32" (default), "int8" (dynamic quantization) or "onnx" (ONNX Runtime)
+EMOJI_BACKEND = os.getenv("EMOJI_BACKEND", "fp32")
+
+
+def model_version(backend=EMOJI_BACKEND) -> str:
+    """Identifies the scores a run produces, for incremental reruns."""
+    models = ",".join(f"{lang}={name}" for lang, name in sorted(EMOJI_MODELS.items()))
+    return f"{models}:{backend}"
+
+
+# Load one emotion classification pipeline
+def load_emotion_classifier(model_name=MODEL_NAME, backend=EMOJI_BACKEND):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    from transformers import pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "fp32":
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    elif backend == "int8":
+        import torch
+
+        model = torch.ao.quantization.quantize_dynamic(
+            AutoModelForSequenceClassification.from_pretrained(model_name),
+            {torch.nn.Linear},
+            dtype=torch.qint8,
+        )
+    elif backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError as e:
+            raise ImportError(
+                "The 'onnx' backend needs `pip install optimum[onnxruntime]`."
+            ) from e
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True
+        )
+    else:
+        raise ValueError(
+            f"Invalid backend '{backend}'. Expected 'fp32', 'int8' or 'onnx'."
+        )
+
+    return pipeline(
+        "text-classification",
+        model=model,
+        tokenizer=tokenizer,
+        return_all_scores=True,
+        top_k=None,
+    )
+
+
+# One pool per process: models load on first use and are shared across calls
+@functools.lru_cache(maxsize=1)
+def get_model_pool() -> ModelPool:
+    return ModelPool(load_emotion_classifier, int(EMOJI_MODEL_MEMORY_MB * 2**20))
+
+
+def get_emotion_classifier(backend=EMOJI_BACKEND, language="en"):
+    return get_model_pool().get((EMOJI_MODELS[language], backend))
 
 
 # Process results
@@ -40,12 +120,125 @@ def generate_score(poems):
             "score": round(result["score"], 4),
         }
         for poem in poems
-        if poem.get("language") == "en"
+        if poem.get("language") in EMOJI_MODELS
         for body in [poem.get("body", "")]
-        for result in emotion_classifier(body)[0]
+        for result in get_emotion_classifier(language=poem["language"])(body)[0]
     ]
 
 
+# Group poem indices into length-sorted batches to keep padding low
+def make_batches(lengths, batch_size, max_batch_tokens=None):
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        # sorted ascending, so the new poem sets the padded length of the batch
+        over_budget = (
+            max_batch_tokens is not None
+            and batch
+            and lengths[i] * (len(batch) + 1) > max_batch_tokens
+        )
+        if len(batch) == batch_size or over_budget:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# Same output as generate_score, scored in batches, one language at a time
+def generate_score_batched(
+    poems,
+    batch_size=EMOJI_BATCH_SIZE,
+    max_batch_tokens=EMOJI_MAX_BATCH_TOKENS,
+    backend=EMOJI_BACKEND,
+):
+    groups = defaultdict(list)
+    for poem in poems:
+        if poem.get("language") in EMOJI_MODELS:
+            groups[poem["language"]].append(poem)
+    skipped = len(poems) - sum(len(group) for group in groups.values())
+    if skipped:
+        logger.info(f"No emotion model for {skipped} poem(s), leaving them out.")
+
+    # languages whose model is already loaded first, so it isn't evicted unused
+    pool = get_model_pool()
+    order = sorted(
+        groups, key=lambda lang: ((EMOJI_MODELS[lang], backend) not in pool, lang)
+    )
+    return [
+        entry
+        for language in order
+        for entry in _score_language(
+            groups[language], language, batch_size, max_batch_tokens, backend
+        )
+    ]
+
+
+def _score_language(poems, language, batch_size, max_batch_tokens, backend):
+    import torch
+
+    # cached in the pool after the first call, so this only measures loads
+    with span("emoji_model_load", backend=backend, language=language):
+        emotion_classifier = get_emotion_classifier(backend, language)
+    bodies = [poem.get("body", "") for poem in poems]
+    encoded = emotion_classifier.tokenizer(bodies, truncation=True)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    results = [None] * len(bodies)
+    with torch.inference_mode(), span(
+        "emoji_inference", backend=backend, language=language
+    ):
+        for batch in make_batches(lengths, batch_size, max_batch_tokens):
+            start = time.perf_counter()
+            outputs = emotion_classifier(
+                [bodies[i] for i in batch], batch_size=len(batch), truncation=True
+            )
+            observe("emoji_batch_seconds", time.perf_counter() - start)
+            observe("emoji_batch_size", len(batch), language=language)
+            # the batch is padded to its longest poem
+            observe("emoji_batch_tokens", max(lengths[i] for i in batch) * len(batch))
+            for i, output in zip(batch, outputs):
+                results[i] = output
+
+    return [
+        {
+            "title": poem.get("title"),
+            "slug": poem.get("slug"),
+            "text": body,
+            "label": result["label"],
+            "score": round(result["score"], 4),
+        }
+        for poem, body, output in zip(poems, bodies, results)
+        for result in output
+    ]
+
+
+# Check a backend's scores against the FP32 reference
+def validate_backend(poems, backend, tolerance=0.02):
+    reference = {
+        (entry["slug"], entry["label"]): entry["score"]
+        for entry in generate_score_batched(poems, backend="fp32")
+    }
+    candidate = {
+        (entry["slug"], entry["label"]): entry["score"]
+        for entry in generate_score_batched(poems, backend=backend)
+    }
+    if reference.keys() != candidate.keys():
+        raise ValueError(f"Backend '{backend}' returned different labels than fp32.")
+
+    max_diff = max(
+        (abs(reference[key] - candidate[key]) for key in reference), default=0.0
+    )
+    if max_diff > tolerance:
+        raise ValueError(
+            f"Backend '{backend}' deviates from fp32 by {max_diff:.4f} "
+            f"(tolerance {tolerance})."
+        )
+    return max_diff
+
+
 def get_top_emotions_grouped(scores, top_k=3):
     grouped = defaultdict(list)
 
@@ -84,8 +277,13 @@ def enrich_with_emoji(dominant_emotions, emoji_map):
     return enriched_emojis
 
 
-# Run
+# Run: on the warm worker when one is listening, in-process otherwise
 def run_emoji_analysis(poems):
-    scores = generate_score(poems)
+    # imported here: the worker module builds on this one
+    from .emoji_worker import request_scores
+
+    scores = request_scores(poems)
+    if scores is None:
+        scores = generate_score_batched(poems)
     dominant_emotions = get_top_emotions_grouped(scores, top_k=3)
     return enrich_with_emoji(dominant_emotions, EMOJI_MAP)
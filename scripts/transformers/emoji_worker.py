@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import argparse
+import tempfile
+import threading
+import socketserver
+from ..metrics import incr, observe
+from .emoji_classifier_en import (
+    EMOJI_BACKEND,
+    EMOJI_MODELS,
+    generate_score_batched,
+    get_emotion_classifier,
+    model_version,
+)
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# where the warm worker listens; an empty value disables it for clients
+EMOJI_WORKER_SOCKET = os.getenv(
+    "EMOJI_WORKER_SOCKET", os.path.join(tempfile.gettempdir(), "poems-emoji.sock")
+)
+# seconds a client waits for a (possibly wedged) worker to accept it
+EMOJI_WORKER_CONNECT_TIMEOUT = float(os.getenv("EMOJI_WORKER_CONNECT_TIMEOUT", "2"))
+# seconds a client waits for its scores before scoring in-process instead:
+# a base plus a share per poem, never more than EMOJI_WORKER_TIMEOUT
+EMOJI_WORKER_REPLY_BASE = float(os.getenv("EMOJI_WORKER_REPLY_BASE", "30"))
+EMOJI_WORKER_SECONDS_PER_POEM = float(os.getenv("EMOJI_WORKER_SECONDS_PER_POEM", "1"))
+EMOJI_WORKER_TIMEOUT = float(os.getenv("EMOJI_WORKER_TIMEOUT", "600"))
+# micro-batching: requests arriving within the wait are scored together
+EMOJI_WORKER_MAX_WAIT_MS = float(os.getenv("EMOJI_WORKER_MAX_WAIT_MS", "20"))
+EMOJI_WORKER_MAX_POEMS = int(os.getenv("EMOJI_WORKER_MAX_POEMS", "256"))
+# fields of a poem the scores depend on (or carry back)
+POEM_FIELDS = ("title", "slug", "language", "body")
+
+_HEADER = struct.Struct(">I")  # message length, then that many bytes of JSON
+
+
+def send_message(sock, obj):
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, length))
+
+
+def _recv_exactly(sock, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Emoji worker connection closed mid-message.")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+class _Job:
+    def __init__(self, poems: list[dict]):
+        self.poems = poems
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmojiWorker:
+    """
+    Long-lived scoring daemon: keeps the emotion models warm in the model
+    pool and serves scoring requests over a Unix socket.
+
+    Connections are handled in threads that only enqueue; one inference
+    thread takes the queued requests, waits up to `max_wait` seconds for more
+    (until `max_poems` are waiting) and scores them in a single
+    `generate_score_batched` call, so concurrent clients share batches.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = EMOJI_WORKER_SOCKET,
+        backend: str = EMOJI_BACKEND,
+        max_wait: float = EMOJI_WORKER_MAX_WAIT_MS / 1000,
+        max_poems: int = EMOJI_WORKER_MAX_POEMS,
+    ):
+        self.socket_path = socket_path
+        self.backend = backend
+        self.max_wait = max_wait
+        self.max_poems = max_poems
+        self.version = model_version(backend)
+        self._jobs = queue.Queue()
+        self._server = None
+
+    def serve_forever(self, preload=()):
+        """Loads the `preload` languages' models, then serves until shutdown."""
+        for language in preload:
+            get_emotion_classifier(self.backend, language)
+        self._remove_stale_socket()
+
+        worker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                worker._handle(self.request)
+
+        # created owner-only: a chmod after bind would leave it open meanwhile
+        umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                self.socket_path, Handler
+            )
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._run_batches, name="emoji-batches", daemon=True
+        ).start()
+        logger.info(f"🔥 Emoji worker ready on {self.socket_path} ({self.version}).")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # left behind by a killed worker
+                return
+        raise RuntimeError(f"An emoji worker is already serving {self.socket_path}.")
+
+    def _handle(self, sock):
+        try:
+            request = recv_message(sock)
+        except (ConnectionError, ValueError, struct.error) as e:
+            logger.warning(f"⚠️ Dropping malformed emoji request: {e}")
+            return
+        if request.get("model_version") != self.version:
+            # scores from other models would be recorded under the wrong version
+            send_message(
+                sock,
+                {
+                    "error": f"worker serves {self.version}, "
+                    f"not {request.get('model_version')}"
+                },
+            )
+            return
+
+        job = _Job(request.get("poems", []))
+        self._jobs.put(job)
+        job.done.wait()
+        try:
+            if job.error is not None:
+                send_message(sock, {"error": job.error})
+            else:
+                send_message(sock, {"scores": job.scores})
+        except OSError as e:
+            # the client gave up waiting and is scoring in-process
+            logger.warning(f"⚠️ Emoji client left before its scores were sent: {e}")
+
+    def _run_batches(self):
+        while True:
+            jobs = self._next_jobs()
+            try:
+                self._score(jobs)
+            except Exception as e:
+                logger.exception(f"❌ Emoji worker batch failed: {e}")
+                for job in jobs:
+                    job.error = str(e)
+            for job in jobs:
+                job.done.set()
+
+    def _next_jobs(self) -> list[_Job]:
+        jobs = [self._jobs.get()]
+        n_poems = len(jobs[0].poems)
+        deadline = time.monotonic() + self.max_wait
+        while n_poems < self.max_poems:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                job = self._jobs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            n_poems += len(job.poems)
+        return jobs
+
+    def _score(self, jobs: list[_Job]):
+        # slugs may repeat across requests: tag each poem with its request
+        tagged = [
+            {**poem, "slug": (j, poem.get("slug"))}
+            for j, job in enumerate(jobs)
+            for poem in job.poems
+        ]
+        observe("emoji_worker_batch_requests", len(jobs))
+        observe("emoji_worker_batch_poems", len(tagged))
+        results = [[] for _ in jobs]
+        for entry in generate_score_batched(tagged, backend=self.backend):
+            j, slug = entry["slug"]
+            results[j].append({**entry, "slug": slug})
+        for job, scores in zip(jobs, results):
+            job.scores = scores
+
+
+def request_scores(
+    poems: list[dict],
+    socket_path: str = EMOJI_WORKER_SOCKET,
+    timeout: float = EMOJI_WORKER_TIMEOUT,
+    backend: str = EMOJI_BACKEND,
+):
+    """
+    Scores from the warm worker, the same as `generate_score_batched` would
+    return in-process.
+
+    Connecting gives up after EMOJI_WORKER_CONNECT_TIMEOUT; the reply is
+    awaited for a time that grows with the number of poems, up to `timeout`.
+
+    Returns:
+        list | None: the scores, or None when no worker is listening (or it
+        failed, or serves other models), so the caller scores in-process.
+    """
+    if not poems or not socket_path or not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(min(EMOJI_WORKER_CONNECT_TIMEOUT, timeout))
+            sock.connect(socket_path)
+            sock.settimeout(
+                min(
+                    EMOJI_WORKER_REPLY_BASE
+                    + EMOJI_WORKER_SECONDS_PER_POEM * len(poems),
+                    timeout,
+                )
+            )
+            send_message(
+                sock,
+                {
+                    "model_version": model_version(backend),
+                    "poems": [
+                        {key: poem[key] for key in POEM_FIELDS if key in poem}
+                        for poem in poems
+                    ],
+                },
+            )
+            response = recv_message(sock)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ Emoji worker unavailable, scoring in-process: {e}")
+        return None
+    if "error" in response:
+        logger.warning(
+            f"⚠️ Emoji worker refused the job, scoring in-process: {response['error']}"
+        )
+        return None
+    incr("emoji_worker_requests")
+    logger.info(f"Scored {len(poems)} poem(s) with the warm emoji worker.")
+    return response["scores"]
+
+
+# python -m scripts.transformers.emoji_worker [--socket PATH] [--preload en,fr]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep the emotion models warm and score poems over a socket."
+    )
+    parser.add_argument("--socket", default=EMOJI_WORKER_SOCKET)
+    parser.add_argument("--backend", default=EMOJI_BACKEND)
+    parser.add_argument(
+        "--preload",
+        default=",".join(EMOJI_MODELS),
+        help="Languages whose models load at startup (comma-separated)",
+    )
+    args = parser.parse_args()
+    preload = [language for language in args.preload.split(",") if language]
+    try:
+        EmojiWorker(args.socket, args.backend).serve_forever(preload)
+    except KeyboardInterrupt:
+        logger.info("Emoji worker stopped.")
@@ -1,6 +1,16 @@
 import openai
 import os
+import json
+import time
+import sqlite3
+import threading
+import random
+import asyncio
 import logging
+import hashlib
+import re
+from .rate_limiter import AsyncRateLimiter
+from ..metrics import span, incr
 
 # basic logging config
 logging.basicConfig(
@@ -9,6 +19,255 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
+LLM_MODEL = "gpt-4"
+# concurrency cap, rate limits and retries for the GPT calls
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "3"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+# on-disk response cache
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# "single" (whole collection per prompt), "map_reduce" (chunked) or "auto"
+LLM_ANALYSIS_MODE = os.getenv("LLM_ANALYSIS_MODE", "auto")
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "3000"))
+LLM_MAX_TOKENS = 1500
+# "prompt" (one grouping prompt over the collection) or "cluster" (local
+# embedding clusters, GPT only names each one from a few representatives)
+LLM_THEME_MODE = os.getenv("LLM_THEME_MODE", "prompt")
+THEME_REPRESENTATIVES = int(os.getenv("THEME_REPRESENTATIVES", "3"))
+THEME_NAME_MAX_TOKENS = 200
+
+SYSTEM_PROMPT = "You are a thoughtful literary critic."
+
+# Prompt templates, filled with the formatted collection
+GROUPING_PROMPT = """ 
+    I'll give you a collection of short poems. 
+    Group them into 3-4 thematic categories based on tone and subtext. 
+    Name each category and describe what connects them.
+
+    Poems:
+    {formatted}
+    """
+
+SUBTEXT_PROMPT = """You're a poet's inner voice. 
+    For each poem, write one sentence that captures what the poet felt but didn't say out loud.
+
+    Poems:
+    {formatted}
+    """
+
+FAVORITES_PROMPT = """Read all short poems below and pick your top 3 favorites. 
+    Rank them 1 to 3 and explain why you chose each one.
+
+    Poems:
+    {formatted}
+    """
+
+# Map-reduce templates: per-chunk notes, then one merge prompt
+THEME_MAP_PROMPT = """I'll give you one batch of poems from a larger collection.
+    List the main themes in this batch, based on tone and subtext.
+    For each theme, give a short name, one sentence on what connects the poems,
+    and the slugs of the poems that belong to it.
+
+    Poems:
+    {formatted}
+    """
+
+THEME_REDUCE_PROMPT = """Below are theme notes taken from several batches of the same poem collection.
+    Merge them into 3-4 thematic categories for the whole collection.
+    Format each one as "**Category N: Name**" followed by a description of what connects them.
+
+    Notes:
+    {notes}
+    """
+
+# Clustered themes: one small prompt per cluster
+THEME_NAME_PROMPT = """These poems are the most representative of one theme in a
+    collection of short poems ({count} poems belong to this theme).
+    Name the theme and describe what connects the poems, based on tone and subtext.
+    Reply in exactly this format:
+    Name: <three to six words>
+    Emoji: <one emoji>
+    Description: <one or two sentences>
+
+    Poems:
+    {formatted}
+    """
+
+FAVORITES_REDUCE_PROMPT = """Below are shortlisted favorite poems, with reasons, from several batches of the same collection.
+    Pick the top 3 favorites overall. Rank them 1 to 3 as "N. Title: why you chose it".
+
+    Shortlists:
+    {notes}
+    """
+
+
+def prompt_version() -> str:
+    """Changes whenever the model, any prompt template or the chunking changes."""
+    key = "\n".join(
+        [
+            LLM_MODEL,
+            GROUPING_PROMPT,
+            SUBTEXT_PROMPT,
+            FAVORITES_PROMPT,
+            THEME_MAP_PROMPT,
+            THEME_REDUCE_PROMPT,
+            FAVORITES_REDUCE_PROMPT,
+            f"{LLM_ANALYSIS_MODE}:{LLM_CONTEXT_TOKENS}:{LLM_CHUNK_TOKENS}",
+        ]
+    )
+    if LLM_THEME_MODE == "cluster":
+        from .embeddings import embedding_version
+        from .theme_clustering import clustering_version
+
+        key += "\n".join(
+            [
+                THEME_NAME_PROMPT,
+                f"cluster:{THEME_REPRESENTATIVES}",
+                embedding_version(),
+                clustering_version(),
+            ]
+        )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+class GPTError(RuntimeError):
+    """Raised when a completion fails for good, instead of returning its text."""
+
+
+class ResponseCache:
+    """
+    SQLite cache of completions keyed by model, prompts and sampling settings.
+
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least recently
+    used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, created REAL, accessed REAL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, temperature, max_tokens) -> str:
+        key = json.dumps([model, system_prompt, prompt, temperature, max_tokens])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Process-wide response cache, or None when LLM_CACHE_BYPASS is set."""
+    global _response_cache
+    if LLM_CACHE_BYPASS:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS * 86400, LLM_CACHE_MAX_ENTRIES
+        )
+    return _response_cache
+
+
+# A failed cache write must not cost the completion it would have stored
+def cache_response(cache: ResponseCache | None, key: str, content: str):
+    if cache is None:
+        return
+    try:
+        cache.put(key, content)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"⚠️ Could not cache GPT response: {e}")
+
+
+_sync_client = None
+
+
+def get_sync_client() -> openai.OpenAI:
+    """Process-wide sync client; retries are handled by ask_gpt, not by it."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = openai.OpenAI(max_retries=0)
+    return _sync_client
+
+
+# Rough, deterministic token estimate (~4 characters per token)
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def record_usage(response, model: str):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    incr("openai_prompt_tokens", usage.prompt_tokens, model=model)
+    incr("openai_completion_tokens", usage.completion_tokens, model=model)
+
+
+# 429s, 5xx and connection problems are worth retrying; anything else isn't
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+# Exponential backoff with full jitter
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def build_messages(prompt: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
 
 
 # Format all poems into a readable string
@@ -18,24 +277,110 @@ def format_poem_collection(poems):
     )
 
 
+# Split poems, in order, into chunks of at most `max_tokens` estimated tokens.
+# A poem larger than the budget gets a chunk of its own.
+def chunk_poems(poems, max_tokens=LLM_CHUNK_TOKENS):
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for poem in poems:
+        tokens = estimate_tokens(format_poem_collection([poem]))
+        if chunk and chunk_tokens + tokens > max_tokens:
+            chunks.append(chunk)
+            chunk = []
+            chunk_tokens = 0
+        chunk.append(poem)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def fits_context(prompt: str) -> bool:
+    return estimate_tokens(prompt) + LLM_MAX_TOKENS <= LLM_CONTEXT_TOKENS
+
+
+def needs_map_reduce(formatted: str) -> bool:
+    return not fits_context(GROUPING_PROMPT.format(formatted=formatted))
+
+
 # GPT prompt
 def ask_gpt(
-    prompt: str, model: str = "gpt-4", max_tokens: int = 1500, temperature: float = 0.7
+    prompt: str,
+    model: str = LLM_MODEL,
+    max_tokens: int = LLM_MAX_TOKENS,
+    temperature: float = 0.7,
+    use_cache: bool = True,
 ) -> str:
-    try:
-        response = openai.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a thoughtful literary critic."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        logger.info(f"[GPT Error]: {e}")
-        return f"[Error]: {str(e)}"
+    cache = get_response_cache() if use_cache else None
+    key = ResponseCache.make_key(model, SYSTEM_PROMPT, prompt, temperature, max_tokens)
+    if cache is not None and (cached := cache.get(key)) is not None:
+        incr("llm_cache_hits")
+        return cached
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            with span("gpt_call", model=model):
+                response = get_sync_client().chat.completions.create(
+                    model=model,
+                    messages=build_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            record_usage(response, model)
+            content = response.choices[0].message.content.strip()
+        except Exception as e:
+            if not is_retryable(e) or attempt == LLM_MAX_RETRIES:
+                raise GPTError(f"GPT request failed: {e}") from e
+            delay = backoff_delay(attempt)
+            incr("openai_retries", model=model)
+            logger.info(f"[GPT Error]: {e}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        cache_response(cache, key, content)
+        return content
+
+
+# GPT prompt, async: rate limited, capped by `semaphore`, retried with backoff
+async def ask_gpt_async(
+    prompt: str,
+    client: openai.AsyncOpenAI,
+    limiter: AsyncRateLimiter,
+    semaphore: asyncio.Semaphore,
+    model: str = LLM_MODEL,
+    max_tokens: int = LLM_MAX_TOKENS,
+    temperature: float = 0.7,
+    use_cache: bool = True,
+) -> str:
+    cache = get_response_cache() if use_cache else None
+    key = ResponseCache.make_key(model, SYSTEM_PROMPT, prompt, temperature, max_tokens)
+    if cache is not None and (cached := cache.get(key)) is not None:
+        incr("llm_cache_hits")
+        return cached
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await limiter.acquire(estimate_tokens(prompt) + max_tokens)
+        try:
+            async with semaphore:
+                with span("gpt_call", model=model):
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=build_messages(prompt),
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    )
+            record_usage(response, model)
+            content = response.choices[0].message.content.strip()
+        except Exception as e:
+            if not is_retryable(e) or attempt == LLM_MAX_RETRIES:
+                raise GPTError(f"GPT request failed: {e}") from e
+            delay = backoff_delay(attempt)
+            incr("openai_retries", model=model)
+            logger.info(f"[GPT Error]: {e}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        cache_response(cache, key, content)
+        return content
 
 
 # Run
@@ -43,32 +388,203 @@ def run_gpt_analysis(poems):
     formatted = format_poem_collection(poems)
 
     logger.info("\n🔍 Grouping poems by theme...")
-    grouping_prompt = f""" 
-    I'll give you a collection of short poems. 
-    Group them into 3-4 thematic categories based on tone and subtext. 
-    Name each category and describe what connects them.
-
-    Poems:
-    {formatted}
-    """
+    grouping_prompt = GROUPING_PROMPT.format(formatted=formatted)
     categories = ask_gpt(grouping_prompt)
 
     logger.info("\n👀 Reading subtexts...")
-    subtext_prompt = f"""You're a poet's inner voice. 
-    For each poem, write one sentence that captures what the poet felt but didn't say out loud.
-
-    Poems:
-    {formatted}
-    """
+    subtext_prompt = SUBTEXT_PROMPT.format(formatted=formatted)
     subtexts = ask_gpt(subtext_prompt)
 
     logger.info("\n🥇 Picking my favorites...")
-    favorites_prompt = f"""Read all short poems below and pick your top 3 favorites. 
-    Rank them 1 to 3 and explain why you chose each one.
-
-    Poems:
-    {formatted}
-    """
+    favorites_prompt = FAVORITES_PROMPT.format(formatted=formatted)
     favorites = ask_gpt(favorites_prompt)
 
     return {"categories": categories, "subtexts": subtexts, "favorites": favorites}
+
+
+# Run, with the prompts in flight concurrently
+async def run_gpt_analysis_async(
+    poems,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    mode=LLM_ANALYSIS_MODE,
+    theme_mode=LLM_THEME_MODE,
+):
+    formatted = format_poem_collection(poems)
+    # retries are handled by ask_gpt_async, not by the client
+    client = openai.AsyncOpenAI(max_retries=0)
+    limiter = AsyncRateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    clustered = theme_mode == "cluster"
+
+    async def ask(prompt, max_tokens=LLM_MAX_TOKENS):
+        return await ask_gpt_async(
+            prompt, client, limiter, semaphore, max_tokens=max_tokens
+        )
+
+    if mode == "map_reduce" or (mode == "auto" and needs_map_reduce(formatted)):
+        analysis = _map_reduce_analysis(poems, ask, themes=not clustered)
+    else:
+        analysis = _single_analysis(formatted, ask, themes=not clustered)
+
+    if clustered:
+        output, themes = await asyncio.gather(analysis, _clustered_themes(poems, ask))
+        output.update(themes)
+    else:
+        output = await analysis
+
+    cache = get_response_cache()
+    if cache is not None:
+        logger.info(
+            f"GPT response cache: {cache.hits} hit(s), {cache.misses} miss(es)."
+        )
+    return output
+
+
+async def _single_analysis(formatted, ask, themes=True):
+    if themes:
+        logger.info("\n🔍👀🥇 Grouping, reading subtexts and picking favorites...")
+    else:
+        logger.info("\n👀🥇 Reading subtexts and picking favorites...")
+    templates = {
+        "categories": GROUPING_PROMPT,
+        "subtexts": SUBTEXT_PROMPT,
+        "favorites": FAVORITES_PROMPT,
+    }
+    if not themes:
+        del templates["categories"]
+    answers = await asyncio.gather(
+        *(ask(template.format(formatted=formatted)) for template in templates.values())
+    )
+    return dict(zip(templates, answers))
+
+
+def parse_theme_name(text: str) -> dict:
+    """Reads the "Name / Emoji / Description" reply of THEME_NAME_PROMPT."""
+    fields = {}
+    for key in ("name", "emoji", "description"):
+        # tolerate markdown emphasis around the labels
+        match = re.search(
+            rf"^[\s*_]*{key}[\s*_]*:[\s*_]*(.+?)[\s*_]*$", text, re.I | re.M
+        )
+        fields[key] = match.group(1) if match else ""
+    return {
+        "title": fields["name"] or text.strip().split("\n")[0][:60],
+        "emoji": (fields["emoji"].split() or ["🧩"])[0],
+        "description": fields["description"],
+    }
+
+
+def _cluster_collection(poems):
+    from .embeddings import embed_poems
+    from .theme_clustering import cluster_themes, representatives
+
+    _, vectors = embed_poems(poems)
+    with span("theme_clustering"):
+        labels, centroids = cluster_themes(vectors)
+        picks = representatives(vectors, labels, centroids, THEME_REPRESENTATIVES)
+    return labels, picks
+
+
+async def _clustered_themes(poems, ask):
+    """
+    Themes from local embedding clusters: every poem gets a theme, and GPT only
+    names each cluster from its few most central poems.
+    """
+    # embedding and clustering are CPU-bound, keep the event loop free
+    labels, picks = await asyncio.to_thread(_cluster_collection, poems)
+    logger.info(f"\n🧮 {len(picks)} theme cluster(s), naming them...")
+    answers = await asyncio.gather(
+        *(
+            ask(
+                THEME_NAME_PROMPT.format(
+                    count=int((labels == c).sum()),
+                    formatted=format_poem_collection([poems[i] for i in pick]),
+                ),
+                max_tokens=THEME_NAME_MAX_TOKENS,
+            )
+            for c, pick in enumerate(picks)
+        )
+    )
+    themes = [
+        {
+            **parse_theme_name(answer),
+            "slugs": [poems[i]["slug"] for i in range(len(poems)) if labels[i] == c],
+        }
+        for c, answer in enumerate(answers)
+    ]
+    # same markdown as the grouping prompt, for readers of "categories"
+    categories = "\n".join(
+        f"**Category {i}: {theme['title']}**\n{theme['description']}"
+        for i, theme in enumerate(themes, 1)
+    )
+    return {"categories": categories, "themes": themes}
+
+
+async def _map_reduce_analysis(poems, ask, themes=True):
+    chunks = chunk_poems(poems)
+    chunk_tokens = [estimate_tokens(format_poem_collection(c)) for c in chunks]
+    logger.info(
+        f"\n🧩 Map-reduce over {len(chunks)} chunk(s), ~{chunk_tokens} tokens each..."
+    )
+
+    # map: themes (unless clustered), subtexts and a favorites shortlist per chunk
+    templates = [SUBTEXT_PROMPT, FAVORITES_PROMPT]
+    if themes:
+        templates.append(THEME_MAP_PROMPT)
+    formatted_chunks = [format_poem_collection(chunk) for chunk in chunks]
+    mapped = await asyncio.gather(
+        *(
+            ask(template.format(formatted=formatted))
+            for formatted in formatted_chunks
+            for template in templates
+        )
+    )
+    step = len(templates)
+    subtexts, shortlists, notes = mapped[0::step], mapped[1::step], mapped[2::step]
+
+    # reduce: subtexts are per poem and simply concatenate, the rest are merged
+    logger.info("\n🔗 Merging chunk results...")
+    reduces = [_reduce(FAVORITES_REDUCE_PROMPT, shortlists, ask)]
+    if themes:
+        reduces.append(_reduce(THEME_REDUCE_PROMPT, notes, ask))
+    favorites, *categories = await asyncio.gather(*reduces)
+    return {
+        **({"categories": categories[0]} if themes else {}),
+        "subtexts": "\n\n".join(subtexts),
+        "favorites": favorites,
+    }
+
+
+def _join_notes(notes) -> str:
+    return "\n\n---\n".join(notes)
+
+
+async def _reduce(template, notes, ask):
+    """
+    Merges the chunk `notes` with `template`. When they don't fit in one
+    prompt, they are merged in groups that do, and the groups' results are
+    merged the same way.
+    """
+    prompt = template.format(notes=_join_notes(notes))
+    if len(notes) < 2 or fits_context(prompt):
+        return await ask(prompt)
+
+    groups = [[]]
+    for note in notes:
+        group = groups[-1]
+        if group and not fits_context(
+            template.format(notes=_join_notes(group + [note]))
+        ):
+            groups.append([note])
+        else:
+            group.append(note)
+    if len(groups) == len(notes):
+        # no two notes fit together: merging can't shrink them any further
+        logger.warning(
+            f"⚠️ Reduce prompt of ~{estimate_tokens(prompt)} tokens exceeds the "
+            f"{LLM_CONTEXT_TOKENS}-token context, sending it as is."
+        )
+        return await ask(prompt)
+    logger.info(f"\n🔗 Merging {len(notes)} notes in {len(groups)} groups first...")
+    merged = await asyncio.gather(*(_reduce(template, g, ask) for g in groups))
+    return await _reduce(template, merged, ask)
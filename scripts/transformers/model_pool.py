@@ -0,0 +1,116 @@
+import os
+import gc
+import logging
+import threading
+from collections import OrderedDict
+from ..metrics import incr, set_gauge
+
+# basic logging config
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> int | None:
+    """Current resident set size (Linux only), None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def model_size_bytes(model) -> int | None:
+    """
+    Bytes of a torch model's parameters and buffers (or a pipeline's model),
+    including the packed weights of dynamically quantized layers.
+    """
+    model = getattr(model, "model", model)
+    if not callable(getattr(model, "parameters", None)):
+        return None
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        # quantized Linear keeps its int8 weight in _packed_params, which is
+        # neither a parameter nor a buffer
+        if hasattr(module, "_packed_params") and callable(
+            getattr(module, "_weight_bias", None)
+        ):
+            tensors.extend(t for t in module._weight_bias() if t is not None)
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelPool:
+    """
+    Lazily loaded models shared across calls, keyed by whatever `loader` takes.
+
+    Models are evicted least recently used first to keep their total size
+    within `memory_budget` bytes; the size of a model is its parameter bytes,
+    or the RSS growth while loading it when it has no torch parameters (ONNX).
+    A model larger than the whole budget is still loaded, alone.
+    """
+
+    def __init__(self, loader, memory_budget: int):
+        self.loader = loader
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._models = OrderedDict()  # key -> (model, size)
+        self._sizes = {}  # last measured size per key, to make room before loading
+        # held while loading, so concurrent callers never load a model twice
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        return key in self._models
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def get(self, key):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                incr("model_pool_hits")
+                return self._models[key][0]
+
+            self.misses += 1
+            incr("model_pool_misses")
+            self._evict(needed=self._sizes.get(key, 0))
+            rss_before = current_rss_bytes()
+            model = self.loader(*key)
+            size = model_size_bytes(model)
+            if size is None:
+                rss_after = current_rss_bytes()
+                size = max(rss_after - rss_before, 0) if rss_before else 0
+            self._sizes[key] = size
+            self._models[key] = (model, size)
+            self._evict(keep=key)
+            if size > self.memory_budget:
+                logger.warning(
+                    f"⚠️ {key} needs {size / 2**20:.0f} MB, more than the "
+                    f"{self.memory_budget / 2**20:.0f} MB model budget."
+                )
+            set_gauge("model_pool_resident_bytes", self.resident_bytes)
+            return model
+
+    def _evict(self, needed: int = 0, keep=None):
+        evicted = False
+        while self.resident_bytes + needed > self.memory_budget:
+            key = next((k for k in self._models if k != keep), None)
+            if key is None:
+                break
+            _, size = self._models.pop(key)
+            self.evictions += 1
+            incr("model_pool_evictions")
+            logger.info(f"Evicted {key} ({size / 2**20:.0f} MB) from the model pool.")
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            gc.collect()
@@ -0,0 +1,134 @@
+import os
+import numpy as np
+
+# candidate numbers of themes; the best silhouette wins
+THEME_MIN_K = int(os.getenv("THEME_MIN_K", "2"))
+THEME_MAX_K = int(os.getenv("THEME_MAX_K", "6"))
+THEME_SEED = int(os.getenv("THEME_SEED", "0"))
+THEME_N_INIT = 4
+THEME_MAX_ITER = 100
+# silhouette is O(n^2): score a fixed sample of larger collections
+SILHOUETTE_SAMPLE = 2000
+
+
+def clustering_version() -> str:
+    """Identifies the clustering settings, for incremental reruns."""
+    return f"kmeans:{THEME_MIN_K}-{THEME_MAX_K}:{THEME_SEED}:{THEME_N_INIT}"
+
+
+def _kmeans_plus_plus(vectors, k, rng):
+    centroids = [vectors[rng.integers(len(vectors))]]
+    for _ in range(1, k):
+        distances = 1 - np.max(vectors @ np.array(centroids).T, axis=1)
+        distances = np.clip(distances, 0, None)
+        total = distances.sum()
+        if total == 0:  # fewer distinct points than k
+            index = rng.integers(len(vectors))
+        else:
+            index = rng.choice(len(vectors), p=distances / total)
+        centroids.append(vectors[index])
+    return np.array(centroids)
+
+
+def spherical_kmeans(
+    vectors, k, seed=THEME_SEED, n_init=THEME_N_INIT, max_iter=THEME_MAX_ITER
+):
+    """
+    K-means on unit vectors with cosine similarity, best of `n_init` seeded
+    k-means++ starts.
+
+    Returns:
+        tuple: (labels, unit centroids).
+    """
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(n_init):
+        centroids = _kmeans_plus_plus(vectors, k, rng)
+        labels = None
+        for _ in range(max_iter):
+            new_labels = np.argmax(vectors @ centroids.T, axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            for c in range(k):
+                members = vectors[labels == c]
+                if len(members):  # empty clusters keep their centroid
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        cohesion = float(np.sum(vectors * centroids[labels]))
+        if best is None or cohesion > best[0]:
+            best = (cohesion, labels, centroids)
+    return best[1], best[2]
+
+
+def silhouette_score(vectors, labels) -> float:
+    """Mean silhouette with cosine distances (vectors are unit rows)."""
+    distances = 1 - vectors @ vectors.T
+    clusters = np.unique(labels)
+    if len(clusters) < 2:
+        return -1.0
+    # mean distance from every point to every cluster, one column per cluster
+    sums = np.stack([distances[:, labels == c].sum(axis=1) for c in clusters], 1)
+    sizes = np.array([np.sum(labels == c) for c in clusters])
+    own = np.searchsorted(clusters, labels)
+    rows = np.arange(len(labels))
+    own_sizes = sizes[own]
+    a = np.where(own_sizes > 1, sums[rows, own] / np.maximum(own_sizes - 1, 1), 0)
+    means = sums / sizes
+    means[rows, own] = np.inf
+    b = means.min(axis=1)
+    s = np.where(own_sizes > 1, (b - a) / np.maximum(np.maximum(a, b), 1e-12), 0)
+    return float(s.mean())
+
+
+def cluster_themes(vectors, min_k=THEME_MIN_K, max_k=THEME_MAX_K, seed=THEME_SEED):
+    """
+    Assigns every poem to a theme, choosing k by silhouette. Deterministic for
+    the same vectors: seeded starts, ties go to the smaller k, and themes are
+    numbered by size (largest first), then by their first poem.
+
+    Returns:
+        tuple: (labels, unit centroids).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, vectors.shape[1]))
+    max_k = min(max_k, n - 1)
+    if max_k < max(min_k, 2):
+        return np.zeros(n, dtype=np.int64), _normalize(vectors.sum(axis=0))[None]
+
+    rng = np.random.default_rng(seed)
+    sample = (
+        np.sort(rng.choice(n, SILHOUETTE_SAMPLE, replace=False))
+        if n > SILHOUETTE_SAMPLE
+        else np.arange(n)
+    )
+    best = None
+    for k in range(max(min_k, 2), max_k + 1):
+        labels, centroids = spherical_kmeans(vectors, k, seed)
+        score = silhouette_score(vectors[sample], labels[sample])
+        if best is None or score > best[0]:
+            best = (score, labels, centroids)
+    _, labels, centroids = best
+
+    used = [c for c in range(len(centroids)) if np.any(labels == c)]
+    order = sorted(used, key=lambda c: (-np.sum(labels == c), np.argmax(labels == c)))
+    remap = np.zeros(len(centroids), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return remap[labels], centroids[order]
+
+
+def representatives(vectors, labels, centroids, n=3) -> list[list[int]]:
+    """Per theme, the indices of the `n` poems closest to its centroid."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    result = []
+    for c, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == c)
+        closeness = vectors[members] @ centroid
+        result.append(members[np.argsort(-closeness, kind="stable")[:n]].tolist())
+    return result
+
+
+def _normalize(vector):
+    return vector / max(np.linalg.norm(vector), 1e-12)
@@ -1,30 +1,30 @@
 import os
+import logging
+import functools
 import streamlit as st
-import re
 from dotenv import load_dotenv
-from scripts.text_process.gcs_import import download_collection
-from scripts.text_process.gcs_import_nlp import (
-    load_json_from_gcs,
-    fetch_latest_blob_from_gcs,
+from scripts.metrics import process_uptime
+from scripts.text_process.app_data import (
+    load_app_data,
+    app_data_version,
+    load_app_snapshot,
 )
+from scripts.text_process.swr_cache import StaleWhileRevalidateCache
+from scripts.text_process.view_model import MEDALS
 from scripts.db.vote_storage import store_vote
+from scripts.db.vote_tally import get_leaderboard
 
 # === Setup ===
 load_dotenv()
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_CLOUD_CREDS_PATH")
+logger = logging.getLogger(__name__)
+# on Cloud Run the service account is ambient, there is no key file
+if os.getenv("GOOGLE_CLOUD_CREDS_PATH"):
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_CLOUD_CREDS_PATH")
 BUCKET_NAME = os.getenv("GCS_BUCKET")
-GCS_PREFIX = "data/poems/"
-
-THEME_EMOJIS = {
-    "Existential Conundrums": "🌀",
-    "Work-Life Balance and Professional Challenges": "💼",
-    "Coping with Reality": "🧠",
-    "Life and Death": "🪦",
-}
-
-LOW_CONFIDENCE_EMOJIS = {
-    "document_egare_n2",
-}
+# seconds between background checks for new GCS data
+APP_REFRESH_INTERVAL = float(os.getenv("APP_REFRESH_INTERVAL", "300"))
+# seconds after a snapshot start before the first check, clear of the first paint
+APP_SNAPSHOT_REFRESH_DELAY = float(os.getenv("APP_SNAPSHOT_REFRESH_DELAY", "5"))
 
 st.set_page_config(page_title="Poetic Interpreter", layout="wide")
 
@@ -76,24 +76,29 @@ p, li {
 
 
 # === Load data ===
-@st.cache_data
-def load_latest_outputs():
-    llm_path = fetch_latest_blob_from_gcs(BUCKET_NAME, "data/llm/")
-    emoji_path = fetch_latest_blob_from_gcs(BUCKET_NAME, "data/emoji/")
-    return (
-        load_json_from_gcs(BUCKET_NAME, llm_path),
-        load_json_from_gcs(BUCKET_NAME, emoji_path),
-        llm_path,
+# one cache per process, shared by every session
+@st.cache_resource
+def get_app_data_cache():
+    cache = StaleWhileRevalidateCache(
+        functools.partial(load_app_data, BUCKET_NAME),
+        functools.partial(app_data_version, BUCKET_NAME),
+        APP_REFRESH_INTERVAL,
     )
+    # paint from the baked snapshot, GCS catches up in the background
+    view, version = load_app_snapshot()
+    if view is not None:
+        # also starts the refresh thread: never stuck on the baked data
+        cache.seed(view, version, refresh_after=APP_SNAPSHOT_REFRESH_DELAY)
+    return cache
 
 
-@st.cache_data
-def get_poems():
-    return download_collection(GCS_PREFIX, BUCKET_NAME)
+# filled in once per process, by the first run to reach the end of the script
+@st.cache_resource
+def get_startup_timings() -> dict:
+    return {}
 
 
-llm_output, emoji_output, llm_path = load_latest_outputs()
-poems = get_poems()
+view = get_app_data_cache().get()
 
 # === Tabbed Interface ===
 tab1, tab2 = st.tabs(["📝 Poetry Collection", "🤖 LLM Analysis"])
@@ -123,66 +128,46 @@ with tab1:
 # === Tab 2: LLM Analysis ===
 with tab2:
     st.markdown("# 📖 Poetry Decoded")
-    st.caption(f"LLM output: `{llm_path.split('/')[-1]}`")
+    st.caption(f"LLM output: `{view['llm_path'].split('/')[-1]}`")
 
     # === Thematic Groupings ===
     st.markdown("## 📚 Thematic Groupings")
     st.markdown("_**Medium confidence**: Generated using `OpenAI's GPT-4` model_")
-
-    def extract_markdown_categories(raw):
-        pattern = r"\*\*Category \d+: (.*?)\*\*\n(.*?)(?=\n\*\*Category \d+:|$)"
-        matches = re.findall(pattern, raw, re.DOTALL)
-        return [{"title": m[0].strip(), "description": m[1].strip()} for m in matches]
-
-    if llm_output and "categories" in llm_output:
-        raw = llm_output["categories"]
-        themes = extract_markdown_categories(raw)
-
-        rows = [themes[i : i + 2] for i in range(0, len(themes), 2)]
-        for row in rows:
-            cols = st.columns(2)
-            for col, theme in zip(cols, row):
-                emoji = THEME_EMOJIS.get(theme["title"], "🧩")
-                col.markdown(
-                    f"<div class='card-box'><h4>{emoji} {theme['title']}</h4><p>{theme['description']}</p></div>",
-                    unsafe_allow_html=True,
-                )
+    if view["categories_html"]:
+        st.markdown(view["categories_html"], unsafe_allow_html=True)
 
     # === GPT's Favorite Poems ===
     st.markdown("## 🏆 GPT's Favorite Poems")
     st.markdown("_**To each their own**: Selected using `OpenAI's GPT-4` model_")
-
-    favorites = llm_output.get("favorites", "")
-    lines = [line.strip() for line in favorites.split("\n") if line.strip()]
-    emoji_map = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-    for i, line in enumerate(lines[:3]):
-        match = re.match(r"\d+\.\s*(.+?):\s*(.+)", line)
-        if match:
-            title, desc = match.groups()
-            st.markdown(f"{emoji_map[i+1]} **{title}**  \n{desc}")
+    st.markdown(view["favorites_markdown"])
 
     # === Emoji Reactions ===
-    st.markdown("## 🎭 Emoji Only - English Poems")
+    st.markdown("## 🎭 Emoji Only")
     st.markdown(
-        "_**Second guessed**: Predicted using `joeddav/distilbert-base-uncased-go-emotions-student` model_"
+        "_**Second guessed**: Predicted using `joeddav/distilbert-base-uncased-go-emotions-student` (English) and `MilaNLProc/xlm-emo-t` (French) models_"
     )
+    st.markdown(view["emoji_markdown"])
 
-    for poem in poems:
-        if poem.get("language") == "en":
-            slug = poem["slug"]
-            title = poem["title"]
-            emoji = emoji_output.get(slug, {}).get("emoji", "❓")
-
-            if slug in LOW_CONFIDENCE_EMOJIS:
-                st.markdown(f"- **{title}** — {emoji} ⚠️ _low confidence_")
-            else:
-                st.markdown(f"- **{title}** — {emoji}")
+    # === Related Poems ===
+    related_markdown = view.get("related_markdown", {})
+    if related_markdown:
+        st.markdown("## 🔗 Related Poems")
+        st.markdown(
+            "_**Close reads**: Nearest neighbors by `sentence-transformers` embeddings_"
+        )
+        related_titles = [
+            title
+            for title, slug in view["title_lookup"].items()
+            if related_markdown.get(slug)
+        ]
+        picked = st.selectbox("Pick a poem:", options=related_titles)
+        if picked:
+            st.markdown(related_markdown[view["title_lookup"][picked]])
 
     # === Poll ===
     st.markdown("## 🗳️ Cast Your Vote")
 
-    title_lookup = {p["title"]: p["slug"] for p in poems}
+    title_lookup = view["title_lookup"]
     selected = st.multiselect(
         "**Forget the models. Trust your read**. pick up to **three** poems that spoke to you most:",
         options=list(title_lookup.keys()),
@@ -201,3 +186,24 @@ with tab2:
         else:
             store_vote(selected)
             st.success("Thanks for voting!")
+
+    try:
+        # never waits on Firestore: the last counts, refreshed in the background
+        leaderboard = get_leaderboard(top_n=3, wait=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Leaderboard unavailable: {e}")
+        leaderboard = []
+    if leaderboard:
+        st.markdown("#### 🏅 Readers' Favorites So Far")
+        st.markdown(
+            "\n\n".join(
+                f"{MEDALS[i+1]} **{title}** — {count} vote(s)"
+                for i, (title, count) in enumerate(leaderboard)
+            )
+        )
+
+# === Startup ===
+startup = get_startup_timings()
+if not startup:
+    startup["first_render_s"] = process_uptime()
+    logger.info(f"⏱️ First render {startup['first_render_s']}s after process start.")